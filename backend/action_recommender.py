@@ -5,22 +5,115 @@ Recommends optimal actions based on historical success rates
 """
 
 from typing import List, Dict
+from dataclasses import dataclass
+import os
+import time
+import threading
+import joblib
 import numpy as np
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.preprocessing import LabelEncoder
 import json
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Candidate actions and resource levels scored for every recommendation
+ACTION_TYPES = (
+    'deploy_patrol', 'increase_surveillance', 'community_engagement',
+    'deploy_officers', 'setup_checkpoints', 'intel_gathering'
+)
+RESOURCE_LEVELS = (5, 10, 15, 20, 25)
+
+# Risk scores (0-100) are quantized into 16 bins so every feature fits in int8
+RISK_BINS = 16
+
+# Persisted models older than this are retrained instead of reused
+MODEL_MAX_AGE_SECONDS = 3600
+
+# Integer codes used as model features (unknown values encode to 0)
+_DISTRICT_CODES = {d: i for i, d in enumerate([
+    'Imphal West', 'Imphal East', 'Churachandpur',
+    'Thoubal', 'Bishnupur', 'Kakching'
+])}
+_ACTION_CODES = {a: i for i, a in enumerate(ACTION_TYPES)}
+
+# (action code, resource level) candidate grid, shape (n_actions, n_levels)
+_RESOURCE_GRID = np.array(RESOURCE_LEVELS, dtype=np.float32)
+_GRID_ACTIONS, _GRID_RESOURCES = np.meshgrid(
+    np.arange(len(ACTION_TYPES), dtype=np.int32), _RESOURCE_GRID, indexing='ij'
+)
+
+# Base risk-reduction impact per action, indexed by action code
+_BASE_IMPACT = np.array([0.15, 0.10, 0.12, 0.18, 0.14, 0.08])
+
+# Human-readable description templates, filled with the resource count
+_ACTION_FMT = {
+    'deploy_patrol': 'Deploy {} officers for mobile patrol',
+    'increase_surveillance': 'Increase surveillance with {} units',
+    'community_engagement': 'Conduct {} community meetings',
+    'deploy_officers': 'Deploy {} additional officers',
+    'setup_checkpoints': 'Setup {} security checkpoints',
+    'intel_gathering': 'Assign {} agents for intelligence gathering'
+}
+
+
+@dataclass(slots=True)
+class Recommendation:
+    """A recommended action with its best resource level"""
+    action_type: str
+    recommended_resources: int
+    success_probability: float  # percent
+    estimated_impact: float
+    priority_score: float
+    description: str
+
+
+def _score_tree(X, feature, threshold, children_left, children_right, leaf_proba):
+    """Walk the fitted decision tree for each row and return P(success)"""
+    out = np.empty(X.shape[0], dtype=np.float64)
+    for i in range(X.shape[0]):
+        node = 0
+        while children_left[node] != -1:
+            if X[i, feature[node]] <= threshold[node]:
+                node = children_left[node]
+            else:
+                node = children_right[node]
+        out[i] = leaf_proba[node]
+    return out
+
+
+if njit is not None:
+    _score_tree = njit(cache=True)(_score_tree)
+
+
 class ActionRecommender:
     """ML-based action recommendation system"""
     
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, model_path: str = 'models/action_recommender.joblib'):
         self.db = db_connection
         self.model = DecisionTreeClassifier(max_depth=5, random_state=42)
         self.label_encoder = LabelEncoder()
         self.is_trained = False
+        self._tree_arrays = None
+        self._train_lock = threading.Lock()
+        self._risk_edges = np.linspace(0, 100, RISK_BINS)
+        self.model_path = model_path
+        
+        if self._has_fresh_model():
+            self.load_model()
     
     def train_model(self):
-        """Train model on historical action success rates"""
+        """Train model on historical action success rates (once per instance)"""
+        with self._train_lock:
+            if self.is_trained:
+                return True
+            return self._train()
+    
+    def _train(self):
+        """Fit the model; callers must hold the training lock"""
         # Get historical actions with outcomes
         historical_data = self.db.query("""
             SELECT 
@@ -45,120 +138,141 @@ class ActionRecommender:
             print("Insufficient training data")
             return False
         
-        # Prepare features
-        X = []
-        y = []
+        # Prepare int8 features column by column into preallocated arrays
+        n = len(historical_data)
+        resources = np.fromiter((r['resource_count'] for r in historical_data), np.float32, n)
+        risk_before = np.fromiter((r['risk_before'] for r in historical_data), np.float32, n)
         
-        for row in historical_data:
-            features = [
-                self._encode_district(row['district']),
-                self._encode_action_type(row['action_type']),
-                row['resource_count'],
-                row['risk_before']
-            ]
-            X.append(features)
-            y.append(row['was_successful'])
+        X = np.empty((n, 4), dtype=np.int8)
+        X[:, 0] = np.fromiter((_DISTRICT_CODES.get(r['district'], 0) for r in historical_data), np.int8, n)
+        X[:, 1] = np.fromiter((_ACTION_CODES.get(r['action_type'], 0) for r in historical_data), np.int8, n)
+        X[:, 2] = np.clip(resources, 0, 127)
+        X[:, 3] = self._quantize_risk(risk_before)
+        y = np.fromiter((r['was_successful'] for r in historical_data), np.int8, n)
         
         # Train
         self.model.fit(X, y)
+        self._export_tree()
         self.is_trained = True
         
+        # Save model
+        self.save_model()
+        
         print(f"Model trained on {len(X)} examples")
         return True
     
-    def recommend_actions(self, district: str, current_risk: float) -> List[Dict]:
-        """Recommend top 3 actions for a district"""
+    def recommend_actions(self, district: str, current_risk: float) -> List[Recommendation]:
+        """Recommend top 3 actions for a district (train_model must have run)"""
         if not self.is_trained:
-            self.train_model()
+            raise RuntimeError("Action recommender model is not trained")
         
-        # Possible action types
-        action_types = [
-            'deploy_patrol', 'increase_surveillance', 'community_engagement',
-            'deploy_officers', 'setup_checkpoints', 'intel_gathering'
-        ]
+        n_actions, n_levels = _GRID_ACTIONS.shape
+        action_codes = _GRID_ACTIONS[:, 0]
+        
+        # One feature row per (action, resource level) candidate, scored in a single call
+        X = np.empty((n_actions * n_levels, 4), dtype=np.int8)
+        X[:, 0] = self._encode_district(district)
+        X[:, 1] = _GRID_ACTIONS.ravel()
+        X[:, 2] = _GRID_RESOURCES.ravel()
+        X[:, 3] = self._quantize_risk(current_risk)
+        
+        proba = self._predict_success(X).reshape(n_actions, n_levels)
+        
+        # Best resource level per action type (first level wins ties)
+        best_idx = proba.argmax(axis=1)
+        best_probs = proba[np.arange(n_actions), best_idx]
+        best_resources = _RESOURCE_GRID[best_idx]
         
-        recommendations = []
+        # Estimated impact and priority for every action at its best level
+        estimated_impacts = self._estimate_impact(action_codes, best_resources, current_risk)
+        priorities = best_probs * estimated_impacts
         
-        for action_type in action_types:
-            # Predict success for different resource levels
-            best_resources = None
-            best_prob = 0
-            
-            for resources in [5, 10, 15, 20, 25]:
-                features = [[
-                    self._encode_district(district),
-                    self._encode_action_type(action_type),
-                    resources,
-                    current_risk
-                ]]
-                
-                # Predict probability of success
-                proba = self.model.predict_proba(features)[0][1]
-                
-                if proba > best_prob:
-                    best_prob = proba
-                    best_resources = resources
-            
-            # Calculate estimated impact
-            estimated_impact = self._estimate_impact(action_type, best_resources, current_risk)
-            
-            # Calculate priority score
-            priority = best_prob * estimated_impact
-            
-            recommendations.append({
-                'action_type': action_type,
-                'recommended_resources': best_resources,
-                'success_probability': round(best_prob * 100, 1),
-                'estimated_impact': round(estimated_impact, 1),
-                'priority_score': round(priority, 2),
-                'description': self._get_action_description(action_type, best_resources)
-            })
+        # Top 3 actions by priority, highest first
+        k = min(3, n_actions)
+        top = np.argpartition(-priorities, k - 1)[:k]
+        top = top[np.argsort(-priorities[top], kind='stable')]
         
-        # Sort by priority and return top 3
-        recommendations.sort(key=lambda x: x['priority_score'], reverse=True)
-        return recommendations[:3]
+        return [
+            Recommendation(
+                action_type=ACTION_TYPES[i],
+                recommended_resources=int(best_resources[i]),
+                success_probability=round(float(best_probs[i]) * 100, 1),
+                estimated_impact=round(float(estimated_impacts[i]), 1),
+                priority_score=round(float(priorities[i]), 2),
+                description=self._get_action_description(ACTION_TYPES[i], int(best_resources[i]))
+            )
+            for i in top
+        ]
+    
+    def save_model(self):
+        """Save trained model to disk"""
+        os.makedirs(os.path.dirname(self.model_path) or '.', exist_ok=True)
+        joblib.dump(
+            {'model': self.model, 'risk_edges': self._risk_edges},
+            self.model_path,
+            compress=3
+        )
+    
+    def load_model(self):
+        """Load trained model from disk"""
+        data = joblib.load(self.model_path)
+        self.model = data['model']
+        self._risk_edges = data['risk_edges']
+        self._export_tree()
+        self.is_trained = True
+    
+    def _has_fresh_model(self) -> bool:
+        """Whether a persisted model exists and is recent enough to reuse"""
+        if not os.path.exists(self.model_path):
+            return False
+        return time.time() - os.path.getmtime(self.model_path) < MODEL_MAX_AGE_SECONDS
+    
+    def _export_tree(self):
+        """Cache the fitted tree's node arrays for the compiled scorer"""
+        tree = self.model.tree_
+        value = tree.value[:, 0, :]
+        # Features are integers, so x <= t is equivalent to x <= floor(t)
+        self._tree_arrays = (
+            tree.feature.astype(np.int32),
+            np.floor(tree.threshold).astype(np.int16),
+            tree.children_left.astype(np.int32),
+            tree.children_right.astype(np.int32),
+            value[:, 1] / value.sum(axis=1)
+        )
+    
+    def _predict_success(self, X: np.ndarray) -> np.ndarray:
+        """Success probability for each feature row"""
+        if self._tree_arrays is None:
+            return self.model.predict_proba(X)[:, 1]
+        return _score_tree(X, *self._tree_arrays)
+    
+    def _quantize_risk(self, risk):
+        """Map risk score(s) on 0-100 to bin indices 0..RISK_BINS"""
+        return np.digitize(risk, self._risk_edges)
     
     def _encode_district(self, district: str) -> int:
         """Encode district to integer"""
-        districts = [
-            'Imphal West', 'Imphal East', 'Churachandpur',
-            'Thoubal', 'Bishnupur', 'Kakching'
-        ]
-        return districts.index(district) if district in districts else 0
+        return _DISTRICT_CODES.get(district, 0)
     
     def _encode_action_type(self, action_type: str) -> int:
         """Encode action type to integer"""
-        types = [
-            'deploy_patrol', 'increase_surveillance', 'community_engagement',
-            'deploy_officers', 'setup_checkpoints', 'intel_gathering'
-        ]
-        return types.index(action_type) if action_type in types else 0
+        return _ACTION_CODES.get(action_type, 0)
     
-    def _estimate_impact(self, action_type: str, resources: int, current_risk: float) -> float:
-        """Estimate risk reduction impact"""
-        # Base impact by action type
-        base_impact = {
-            'deploy_patrol': 0.15,
-            'increase_surveillance': 0.10,
-            'community_engagement': 0.12,
-            'deploy_officers': 0.18,
-            'setup_checkpoints': 0.14,
-            'intel_gathering': 0.08
-        }
-        
-        # Scale by resources and current risk
-        impact = base_impact.get(action_type, 0.10) * (resources / 10) * (current_risk / 100)
+    def _estimate_impact(
+        self,
+        action_codes: np.ndarray,
+        resources: np.ndarray,
+        current_risk: float
+    ) -> np.ndarray:
+        """Estimate risk reduction impact for each (action, resources) pair"""
+        # Scale base impact by resources and current risk
+        impact = _BASE_IMPACT[action_codes] * (resources / 10) * (current_risk / 100)
         
-        return min(impact * current_risk, current_risk * 0.3)  # Max 30% reduction
+        return np.minimum(impact * current_risk, current_risk * 0.3)  # Max 30% reduction
     
     def _get_action_description(self, action_type: str, resources: int) -> str:
         """Get human-readable description"""
-        descriptions = {
-            'deploy_patrol': f'Deploy {resources} officers for mobile patrol',
-            'increase_surveillance': f'Increase surveillance with {resources} units',
-            'community_engagement': f'Conduct {resources} community meetings',
-            'deploy_officers': f'Deploy {resources} additional officers',
-            'setup_checkpoints': f'Setup {resources} security checkpoints',
-            'intel_gathering': f'Assign {resources} agents for intelligence gathering'
-        }
-        return descriptions.get(action_type, f'{action_type} with {resources} resources')
+        template = _ACTION_FMT.get(action_type)
+        if template is None:
+            return f'{action_type} with {resources} resources'
+        return template.format(resources)
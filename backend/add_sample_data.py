@@ -4,9 +4,11 @@ Run this to populate the database with sample messages for testing
 """
 
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 
 BASE_URL = "http://localhost:8000"
+MAX_WORKERS = 16
 
 # Sample districts from each state
 SAMPLE_DISTRICTS = [
@@ -45,43 +47,62 @@ SAMPLE_MESSAGES = [
     "Emergency response drill conducted successfully",
 ]
 
+def _create_session() -> requests.Session:
+    """HTTP session with a keep-alive connection pool sized for the workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _ingest_message(session: requests.Session, district: str, i: int, message: str) -> str:
+    """Post one sample message and return a status line"""
+    data = {
+        "district": district,
+        "text": f"{message} - Sample data {i+1}",
+        "source_type": "public_source",
+        "geo_sensitivity": "medium"
+    }
+    
+    try:
+        response = session.post(f"{BASE_URL}/ingest", json=data)
+        if response.status_code == 200:
+            return f"  ✓ {district}: message {i+1} added"
+        return f"  ✗ {district}: failed: {response.status_code}"
+    except Exception as e:
+        return f"  ✗ {district}: error: {e}"
+
+def _analyze_district(session: requests.Session, district: str) -> str:
+    """Trigger analysis for a district and return a status line"""
+    try:
+        response = session.post(f"{BASE_URL}/analyze", json={"district": district})
+        if response.status_code == 200:
+            result = response.json()
+            return f"  ✓ {district}: analysis complete - Risk Score: {result.get('risk_score', {}).get('score', 'N/A')}"
+        return f"  ✗ {district}: analysis failed: {response.status_code}"
+    except Exception as e:
+        return f"  ✗ {district}: analysis error: {e}"
+
 def add_sample_data():
     """Add sample messages for testing"""
     print("Adding sample data to NE-NETRA...")
     
-    for district in SAMPLE_DISTRICTS:
-        print(f"\n📍 Adding data for {district}...")
-        
-        # Add 3-5 messages per district
-        for i, message in enumerate(SAMPLE_MESSAGES[:5]):
-            data = {
-                "district": district,
-                "text": f"{message} - Sample data {i+1}",
-                "source_type": "public_source",
-                "geo_sensitivity": "medium"
-            }
-            
-            try:
-                response = requests.post(f"{BASE_URL}/ingest", json=data)
-                if response.status_code == 200:
-                    print(f"  ✓ Message {i+1} added")
-                else:
-                    print(f"  ✗ Failed: {response.status_code}")
-            except Exception as e:
-                print(f"  ✗ Error: {e}")
-            
-            time.sleep(0.1)  # Small delay
+    # Add 5 messages per district
+    payloads = [
+        (district, i, message)
+        for district in SAMPLE_DISTRICTS
+        for i, message in enumerate(SAMPLE_MESSAGES[:5])
+    ]
+    
+    with _create_session() as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        print(f"\n📍 Adding {len(payloads)} messages across {len(SAMPLE_DISTRICTS)} districts...")
+        for line in executor.map(lambda p: _ingest_message(session, *p), payloads):
+            print(line)
         
-        # Trigger analysis
-        try:
-            response = requests.post(f"{BASE_URL}/analyze", json={"district": district})
-            if response.status_code == 200:
-                result = response.json()
-                print(f"  ✓ Analysis complete - Risk Score: {result.get('risk_score', {}).get('score', 'N/A')}")
-            else:
-                print(f"  ✗ Analysis failed: {response.status_code}")
-        except Exception as e:
-            print(f"  ✗ Analysis error: {e}")
+        # Trigger analysis once every district's messages are in
+        print("\n📊 Analyzing districts...")
+        for line in executor.map(lambda d: _analyze_district(session, d), SAMPLE_DISTRICTS):
+            print(line)
     
     print("\n✅ Sample data added successfully!")
     print("Refresh your dashboard to see the data.")
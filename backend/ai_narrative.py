@@ -7,13 +7,17 @@ Generates human-readable explanations for risk scores using LLM.
 from typing import List, Dict, Optional
 import os
 from datetime import datetime
-import json
+import re
+import orjson
 
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None
 
+# Body of a ```json ... ``` (or bare ```) fenced block in LLM output
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
 class AIRiskNarrative:
     def __init__(self, api_key: Optional[str] = None):
         """Initialize with Google Gemini API"""
@@ -77,7 +81,7 @@ Format as JSON:
 }}"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(prompt)
             result = self._parse_llm_response(response.text)
             result['confidence'] = 0.85  # LLM-based confidence
             return result
@@ -132,7 +136,7 @@ Format as JSON:
 }}"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(prompt)
             return self._parse_llm_response(response.text)
         except Exception as e:
             print(f"Morning briefing generation failed: {e}")
@@ -144,7 +148,7 @@ Format as JSON:
         if score > 70:
             alerts.append(f"CRITICAL: {district} risk score is significantly elevated at {score:.0f}")
         
-        if any(s.get('severity', 0) >= 4 for s in signals):
+        if self._count_high_severity(signals, 'severity') > 0:
             alerts.append("High-severity incidents detected in the last 24 hours")
             
         return {
@@ -189,7 +193,7 @@ Format as JSON:
 }}"""
 
         try:
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(prompt)
             return self._parse_llm_response(response.text)
         except Exception as e:
             print(f"Playbook generation failed: {e}")
@@ -224,20 +228,20 @@ Format as JSON:
             ],
             "comm_strategy": "Maintain standard public information flow."
         }
+
+    def _parse_llm_response(self, text: str) -> Dict:
         """Parse LLM JSON response"""
+        # Extract JSON from markdown code blocks if present
+        match = _JSON_BLOCK_RE.search(text)
+        payload = match.group(1) if match else text
+        
         try:
-            # Extract JSON from markdown code blocks if present
-            if '```json' in text:
-                text = text.split('```json')[1].split('```')[0]
-            elif '```' in text:
-                text = text.split('```')[1].split('```')[0]
-            
-            return json.loads(text.strip())
-        except:
+            return orjson.loads(payload.strip())
+        except orjson.JSONDecodeError:
             # Fallback parsing
             return {
-                'summary': text[:200],
-                'briefing': text[:200],  # For morning briefing
+                'summary': payload[:200],
+                'briefing': payload[:200],  # For morning briefing
                 'key_factors': ['LLM response parsing failed'],
                 'recommendations': ['Review signals manually'],
                 'urgent_alerts': ['Check logs'],
@@ -253,7 +257,7 @@ Format as JSON:
     ) -> Dict:
         """Rule-based fallback when LLM unavailable"""
         signal_count = len(signals)
-        high_severity_count = len([s for s in signals if s.get('severity_score', 0) >= 4])
+        high_severity_count = self._count_high_severity(signals, 'severity_score')
         
         summary = f"{district} is at {risk_level} risk ({risk_score:.0f}/100) based on {signal_count} recent signals"
         if high_severity_count > 0:
@@ -284,3 +288,12 @@ Format as JSON:
             'recommendations': recommendations[:5],
             'confidence': 0.65  # Lower confidence for rule-based
         }
+
+    @staticmethod
+    def _count_high_severity(signals: List[Dict], key: str) -> int:
+        """Count signals with severity >= 4 in a single pass"""
+        count = 0
+        for s in signals:
+            if s.get(key, 0) >= 4:
+                count += 1
+        return count
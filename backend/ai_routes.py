@@ -5,23 +5,65 @@ FastAPI routes for AI-powered features.
 """
 
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from sqlalchemy import select, func
 from typing import List, Optional, Dict
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
+from cachetools import TTLCache
+import asyncio
+import weakref
+import numpy as np
 import pandas as pd
 
+from .database import AsyncSessionLocal, RiskScore, Message, OfficerReview
 from .ai_narrative import AIRiskNarrative
 from .ml_predictor import RiskPredictor
 from .pattern_detector import PatternDetector
 from .sentiment_analyzer import SentimentAnalyzer
 
-router = APIRouter(prefix="/api/ai", tags=["AI/ML"])
+router = APIRouter(prefix="/api/ai", tags=["AI/ML"], default_response_class=ORJSONResponse)
 
-# Initialize services (singleton pattern)
-narrative_service = AIRiskNarrative()
-predictor service = RiskPredictor()
-pattern_service = PatternDetector()
-sentiment_service = SentimentAnalyzer()
+
+# Services are created on first use and shared per worker (lazy singletons)
+@lru_cache(maxsize=1)
+def get_narrative_service() -> AIRiskNarrative:
+    return AIRiskNarrative()
+
+
+@lru_cache(maxsize=1)
+def get_predictor_service() -> RiskPredictor:
+    return RiskPredictor()
+
+
+@lru_cache(maxsize=1)
+def get_pattern_service() -> PatternDetector:
+    return PatternDetector()
+
+
+@lru_cache(maxsize=1)
+def get_sentiment_service() -> SentimentAnalyzer:
+    return SentimentAnalyzer()
+
+
+# Briefings are LLM-generated and polled by dashboards, so keep each for 5 minutes
+_BRIEFING_CACHE = TTLCache(maxsize=128, ttl=300)
+# A district's lock lives only while requests hold it, so unknown district names don't accumulate
+_BRIEFING_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def invalidate_briefing(district: str):
+    """Drop a district's cached briefing (call when new signals are ingested)"""
+    _BRIEFING_CACHE.pop(district, None)
+
+
+def _briefing_lock(district: str) -> asyncio.Lock:
+    """Lock shared by concurrent briefing requests for one district"""
+    lock = _BRIEFING_LOCKS.get(district)
+    if lock is None:
+        lock = _BRIEFING_LOCKS[district] = asyncio.Lock()
+    return lock
 
 
 # Request/Response Models
@@ -40,9 +82,16 @@ class NarrativeResponse(BaseModel):
     confidence: float
 
 
+class HistoricalPoint(BaseModel):
+    date: date
+    risk_score: float
+    signal_count: int = 0
+    avg_severity: float = 0.0
+
+
 class PredictionRequest(BaseModel):
     district: str
-    historical_data: List[Dict]  # List of {date, risk_score, signal_count, avg_severity}
+    historical_data: List[HistoricalPoint]
 
 
 class PredictionResponse(BaseModel):
@@ -67,7 +116,10 @@ class SentimentBatchRequest(BaseModel):
 
 
 @router.post("/narrative", response_model=NarrativeResponse)
-async def generate_risk_narrative(request: NarrativeRequest):
+async def generate_risk_narrative(
+    request: NarrativeRequest,
+    narrative_service: AIRiskNarrative = Depends(get_narrative_service)
+):
     """
     Generate AI-powered narrative explaining risk score
     
@@ -95,7 +147,10 @@ async def generate_risk_narrative(request: NarrativeRequest):
 
 
 @router.post("/predict", response_model=PredictionResponse)
-async def predict_7_days(request: PredictionRequest):
+async def predict_7_days(
+    request: PredictionRequest,
+    predictor_service: RiskPredictor = Depends(get_predictor_service)
+):
     """
     Predict next 7 days of risk scores
     
@@ -110,13 +165,19 @@ async def predict_7_days(request: PredictionRequest):
     }
     """
     try:
-        # Convert to DataFrame
-        df = pd.DataFrame(request.historical_data)
-        df['date'] = pd.to_datetime(df['date'])
+        # Convert to column arrays
+        points = request.historical_data
+        n = len(points)
+        recent_data = {
+            'date': np.array([p.date for p in points], dtype='datetime64[D]'),
+            'risk_score': np.fromiter((p.risk_score for p in points), np.float64, n),
+            'signal_count': np.fromiter((p.signal_count for p in points), np.float64, n),
+            'avg_severity': np.fromiter((p.avg_severity for p in points), np.float64, n)
+        }
         
         result = predictor_service.predict_7_days(
             district=request.district,
-            recent_data=df
+            recent_data=recent_data
         )
         return result
     except Exception as e:
@@ -124,15 +185,18 @@ async def predict_7_days(request: PredictionRequest):
 
 
 @router.post("/patterns")
-async def detect_patterns(request: PatternRequest):
+async def detect_patterns(
+    request: PatternRequest,
+    pattern_service: PatternDetector = Depends(get_pattern_service)
+):
     """
     Detect patterns in historical data
     
     Returns list of detected patterns
     """
     try:
+        # Date parsing happens inside the detector
         df = pd.DataFrame(request.historical_data)
-        df['date'] = pd.to_datetime(df['date'])
         
         patterns = pattern_service.detect_all_patterns(
             district=request.district,
@@ -145,7 +209,10 @@ async def detect_patterns(request: PatternRequest):
 
 
 @router.post("/sentiment")
-async def analyze_sentiment(request: SentimentRequest):
+async def analyze_sentiment(
+    request: SentimentRequest,
+    sentiment_service: SentimentAnalyzer = Depends(get_sentiment_service)
+):
     """
     Analyze sentiment of a single text
     
@@ -163,7 +230,10 @@ async def analyze_sentiment(request: SentimentRequest):
 
 
 @router.post("/sentiment/batch")
-async def analyze_sentiment_batch(request: SentimentBatchRequest):
+async def analyze_sentiment_batch(
+    request: SentimentBatchRequest,
+    sentiment_service: SentimentAnalyzer = Depends(get_sentiment_service)
+):
     """
     Analyze sentiment of multiple texts
     
@@ -181,45 +251,100 @@ async def analyze_sentiment_batch(request: SentimentBatchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _latest_risk_score(district: str) -> Optional[RiskScore]:
+    """Most recent risk score for a district"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(RiskScore)
+            .where(RiskScore.district == district)
+            .order_by(RiskScore.timestamp.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+async def _latest_messages(district: str, limit: int = 10) -> List[Message]:
+    """Most recent messages for a district"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Message)
+            .where(Message.district == district)
+            .order_by(Message.timestamp.desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+async def _district_counts(district: str) -> Dict[str, int]:
+    """Message and review counts for a district"""
+    async with AsyncSessionLocal() as db:
+        message_count = await db.scalar(
+            select(func.count()).select_from(Message).where(Message.district == district)
+        )
+        review_count = await db.scalar(
+            select(func.count()).select_from(OfficerReview).where(OfficerReview.district == district)
+        )
+        return {"total_messages": message_count, "reviews_submitted": review_count}
+
+
 @router.get("/briefing/{district}")
-async def get_morning_briefing(district: str, db: Session = Depends(get_db)):
+async def get_morning_briefing(
+    district: str,
+    narrative_service: AIRiskNarrative = Depends(get_narrative_service)
+):
     """
     Get situational morning briefing for a district
     """
-    try:
-        from .database import RiskScore, Message
-        from .main import get_district_stats # We might need to move this helper
-        
-        # Get latest risk score
-        risk_score = db.query(RiskScore).filter(
-            RiskScore.district == district
-        ).order_by(RiskScore.timestamp.desc()).first()
+    cached = _BRIEFING_CACHE.get(district)
+    if cached is not None:
+        return cached
+    
+    # Only one request per district regenerates on a miss; the rest wait for it
+    async with _briefing_lock(district):
+        cached = _BRIEFING_CACHE.get(district)
+        if cached is not None:
+            return cached
         
-        if not risk_score:
-            raise HTTPException(status_code=404, detail="No risk data found for this district")
+        try:
+            # Independent reads run concurrently, each on its own session
+            risk_score, messages, counts = await asyncio.gather(
+                _latest_risk_score(district),
+                _latest_messages(district),
+                _district_counts(district)
+            )
             
-        # Get latest signals
-        messages = db.query(Message).filter(Message.district == district).order_by(Message.timestamp.desc()).limit(10).all()
-        signals = [{"event_summary": m.text, "severity": m.toxicity_score * 5} for m in messages]
-        
-        # Get stats
-        from .main import get_district_stats
-        stats = get_district_stats(district, db)
-        
-        result = await narrative_service.generate_morning_briefing(
-            district=district,
-            risk_score=risk_score.score,
-            risk_level=risk_score.risk_level,
-            signals=signals,
-            stats=stats
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            if not risk_score:
+                raise HTTPException(status_code=404, detail="No risk data found for this district")
+            
+            signals = [{"event_summary": m.text, "severity": m.toxicity_score * 5} for m in messages]
+            
+            stats = {
+                "district": district,
+                "total_messages": counts["total_messages"],
+                "current_risk_score": risk_score.score,
+                "current_risk_level": risk_score.risk_level,
+                "reviews_submitted": counts["reviews_submitted"]
+            }
+            
+            result = await narrative_service.generate_morning_briefing(
+                district=district,
+                risk_score=risk_score.score,
+                risk_level=risk_score.risk_level,
+                signals=signals,
+                stats=stats
+            )
+            _BRIEFING_CACHE[district] = result
+            return result
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(
+    narrative_service: AIRiskNarrative = Depends(get_narrative_service),
+    predictor_service: RiskPredictor = Depends(get_predictor_service),
+    sentiment_service: SentimentAnalyzer = Depends(get_sentiment_service)
+):
     """Check if AI services are operational"""
     return {
         "narrative": narrative_service.model is not None,
@@ -5,35 +5,79 @@ Detects unusual patterns using IsolationForest + SHAP explanations
 """
 
 from typing import List, Dict
+from collections import OrderedDict
 import numpy as np
+from joblib import parallel_backend
 from sklearn.ensemble import IsolationForest
 import shap
-import pandas as pd
+
+# Model feature columns, in order
+FEATURE_NAMES = ['risk_score', 'day_of_week', 'hour_of_day', 'signal_count', 'avg_severity']
+
+# Max SHAP vectors kept in the explanation cache
+SHAP_CACHE_SIZE = 1024
+
+# Human-readable explanation per top feature
+_EXPLANATIONS = {
+    'risk_score': 'Unusually high/low risk score for this time period',
+    'signal_count': 'Abnormal number of signals detected',
+    'avg_severity': 'Severity scores deviate from normal pattern',
+    'day_of_week': 'Unusual pattern for this day of the week',
+    'hour_of_day': 'Unexpected activity at this hour'
+}
+
+# Root cause category per top feature
+_ROOT_CAUSE = {
+    'signal_count': 'sudden_activity_spike',
+    'avg_severity': 'sudden_activity_spike',
+    'risk_score': 'risk_score_outlier',
+    'day_of_week': 'temporal_anomaly',
+    'hour_of_day': 'temporal_anomaly'
+}
+
+
+def _feature_matrix(rows: List[Dict]) -> np.ndarray:
+    """Build the float32 model input from query rows (NULLs become 0)"""
+    return np.array(
+        [[row[name] or 0 for name in FEATURE_NAMES] for row in rows],
+        dtype=np.float32
+    )
+
 
 class AnomalyDetector:
     """Detect anomalies with explainable AI"""
     
     def __init__(self, db_connection):
         self.db = db_connection
-        self.model = IsolationForest(contamination=0.1, random_state=42)
+        self.model = IsolationForest(contamination=0.1, random_state=42, n_jobs=-1)  # trees built in parallel
         self.explainer = None
         self.is_trained = False
+        self._shap_cache: OrderedDict = OrderedDict()
     
     def train(self):
         """Train anomaly detection model"""
         # Get historical risk patterns
         data = self.db.query("""
+            WITH sig AS (
+                SELECT 
+                    district,
+                    DATE(timestamp) as d,
+                    COUNT(*) as signal_count,
+                    AVG(severity_score) as avg_severity
+                FROM signals
+                WHERE timestamp >= CURRENT_DATE - INTERVAL '90 days'
+                GROUP BY district, DATE(timestamp)
+            )
             SELECT 
-                district,
-                score as risk_score,
-                EXTRACT(DOW FROM date) as day_of_week,
+                rs.district,
+                rs.score as risk_score,
+                EXTRACT(DOW FROM rs.date) as day_of_week,
                 EXTRACT(HOUR FROM NOW()) as hour_of_day,
-                (SELECT COUNT(*) FROM signals s WHERE s.district = rs.district 
-                 AND DATE(s.timestamp) = rs.date) as signal_count,
-                (SELECT AVG(severity_score) FROM signals s WHERE s.district = rs.district 
-                 AND DATE(s.timestamp) = rs.date) as avg_severity
+                COALESCE(sig.signal_count, 0) as signal_count,
+                sig.avg_severity
             FROM risk_scores rs
-            WHERE date >= CURRENT_DATE - INTERVAL '90 days'
+            LEFT JOIN sig ON sig.district = rs.district AND sig.d = rs.date
+            WHERE rs.date >= CURRENT_DATE - INTERVAL '90 days'
         """)
         
         if len(data) < 50:
@@ -41,14 +85,14 @@ class AnomalyDetector:
             return False
         
         # Prepare features
-        df = pd.DataFrame(data)
-        X = df[['risk_score', 'day_of_week', 'hour_of_day', 'signal_count', 'avg_severity']].fillna(0)
+        X = _feature_matrix(data)
         
         # Train
         self.model.fit(X)
         
-        # Create SHAP explainer
-        self.explainer = shap.Explainer(self.model.predict, X)
+        # Create SHAP explainer (exact TreeSHAP, no background sample needed)
+        self.explainer = shap.TreeExplainer(self.model)
+        self._shap_cache.clear()
         
         self.is_trained = True
         print(f"Anomaly detector trained on {len(X)} samples")
@@ -61,117 +105,119 @@ class AnomalyDetector:
         
         # Get recent data
         recent_data = self.db.query("""
+            WITH sig AS (
+                SELECT 
+                    DATE(timestamp) as d,
+                    COUNT(*) as signal_count,
+                    AVG(severity_score) as avg_severity
+                FROM signals
+                WHERE district = %s AND timestamp >= CURRENT_DATE - INTERVAL '7 days'
+                GROUP BY DATE(timestamp)
+            )
             SELECT 
-                date,
-                score as risk_score,
-                EXTRACT(DOW FROM date) as day_of_week,
+                rs.date,
+                rs.score as risk_score,
+                EXTRACT(DOW FROM rs.date) as day_of_week,
                 EXTRACT(HOUR FROM NOW()) as hour_of_day,
-                (SELECT COUNT(*) FROM signals s WHERE s.district = %s 
-                 AND DATE(s.timestamp) = rs.date) as signal_count,
-                (SELECT AVG(severity_score) FROM signals s WHERE s.district = %s 
-                 AND DATE(s.timestamp) = rs.date) as avg_severity
+                COALESCE(sig.signal_count, 0) as signal_count,
+                sig.avg_severity
             FROM risk_scores rs
-            WHERE district = %s AND date >= CURRENT_DATE - INTERVAL '7 days'
-            ORDER BY date DESC
-        """, (district, district, district))
+            LEFT JOIN sig ON sig.d = rs.date
+            WHERE rs.district = %s AND rs.date >= CURRENT_DATE - INTERVAL '7 days'
+            ORDER BY rs.date DESC
+        """, (district, district))
         
         if not recent_data:
             return []
         
+        # Prepare features for all days at once
+        X = _feature_matrix(recent_data)
+        
+        # Predict (sklearn scores trees sequentially unless a backend is set)
+        with parallel_backend('threading', n_jobs=-1):
+            predictions = self.model.predict(X)
+            anomaly_scores = self.model.score_samples(X)
+        
         anomalies = []
         
-        for row in recent_data:
-            # Prepare features
-            X = pd.DataFrame([{
-                'risk_score': row['risk_score'],
-                'day_of_week': row['day_of_week'],
-                'hour_of_day': row['hour_of_day'],
-                'signal_count': row['signal_count'] or 0,
-                'avg_severity': row['avg_severity'] or 0
-            }])
+        for i in np.flatnonzero(predictions == -1):  # Anomalies only
+            row = recent_data[i]
             
-            # Predict
-            prediction = self.model.predict(X)[0]
-            anomaly_score = self.model.score_samples(X)[0]
+            # Get explanation
+            explanation = self._explain_anomaly(X[i:i + 1], row)
             
-            if prediction == -1:  # Anomaly detected
-                # Get explanation
-                explanation = self._explain_anomaly(X)
-                
-                anomalies.append({
-                    'date': row['date'].isoformat(),
-                    'district': district,
-                    'anomaly_score': round(float(anomaly_score), 3),
-                    'risk_score': row['risk_score'],
-                    'signal_count': row['signal_count'],
-                    'explanation': explanation,
-                    'is_false_positive': self._check_false_positive(row),
-                    'root_cause': self._identify_root_cause(explanation)
-                })
+            anomalies.append({
+                'date': row['date'].isoformat(),
+                'district': district,
+                'anomaly_score': round(float(anomaly_scores[i]), 3),
+                'risk_score': row['risk_score'],
+                'signal_count': row['signal_count'],
+                'explanation': explanation,
+                'is_false_positive': self._check_false_positive(row),
+                'root_cause': self._identify_root_cause(explanation)
+            })
         
         return anomalies
     
-    def _explain_anomaly(self, X: pd.DataFrame) -> Dict:
+    def _explain_anomaly(self, X: np.ndarray, row: Dict) -> Dict:
         """Generate SHAP explanation for anomaly"""
         if not self.explainer:
             return {'error': 'Explainer not initialized'}
         
         try:
-            # Calculate SHAP values
-            shap_values = self.explainer(X)
-            
-            # Get feature contributions
-            feature_names = X.columns.tolist()
-            contributions = {}
+            # Calculate SHAP values (similar feature patterns share one result)
+            shap_row = self._cached_shap_values(X)
             
-            for i, feature in enumerate(feature_names):
-                contributions[feature] = {
-                    'value': float(X[feature].iloc[0]),
-                    'impact': float(shap_values.values[0][i]),
-                    'importance': abs(float(shap_values.values[0][i]))
-                }
+            # Top 3 features by |impact| (ties keep feature order, like a stable sort)
+            importance = np.abs(shap_row)
+            top_idx = np.sort(np.argpartition(importance, -3)[-3:])
+            top_idx = top_idx[np.argsort(-importance[top_idx], kind='stable')]
             
-            # Sort by importance
-            sorted_features = sorted(
-                contributions.items(),
-                key=lambda x: x[1]['importance'],
-                reverse=True
-            )
+            top_feature = top_idx[0]
             
             return {
                 'top_factors': [
                     {
-                        'feature': name,
-                        'value': data['value'],
-                        'impact': round(data['impact'], 3)
+                        'feature': FEATURE_NAMES[i],
+                        'value': float(row[FEATURE_NAMES[i]] or 0),
+                        'impact': round(float(shap_row[i]), 3)
                     }
-                    for name, data in sorted_features[:3]
+                    for i in top_idx
                 ],
-                'summary': self._generate_explanation_text(sorted_features)
+                'summary': self._generate_explanation_text(
+                    FEATURE_NAMES[top_feature], float(shap_row[top_feature])
+                )
             }
             
         except Exception as e:
             print(f"SHAP explanation failed: {e}")
             return {'error': str(e)}
     
-    def _generate_explanation_text(self, sorted_features: List) -> str:
-        """Generate human-readable explanation"""
-        if not sorted_features:
-            return "Unable to generate explanation"
-        
-        top_feature = sorted_features[0]
-        feature_name = top_feature[0]
-        impact = top_feature[1]['impact']
-        
-        explanations = {
-            'risk_score': 'Unusually high/low risk score for this time period',
-            'signal_count': 'Abnormal number of signals detected',
-            'avg_severity': 'Severity scores deviate from normal pattern',
-            'day_of_week': 'Unusual pattern for this day of the week',
-            'hour_of_day': 'Unexpected activity at this hour'
-        }
-        
-        base_text = explanations.get(feature_name, f'Unusual {feature_name}')
+    def _cached_shap_values(self, X: np.ndarray) -> np.ndarray:
+        """SHAP values for a single row, memoized on a coarse feature key"""
+        row = X[0]
+        key = (
+            round(float(row[0]), -1),  # risk band
+            int(row[1]),
+            int(row[2]),
+            int(row[3]),
+            round(float(row[4]), 1)
+        )
+        
+        shap_row = self._shap_cache.get(key)
+        if shap_row is not None:
+            self._shap_cache.move_to_end(key)
+            return shap_row
+        
+        shap_row = self.explainer.shap_values(X)[0]
+        self._shap_cache[key] = shap_row
+        if len(self._shap_cache) > SHAP_CACHE_SIZE:
+            self._shap_cache.popitem(last=False)
+        return shap_row
+    
+    def _generate_explanation_text(self, feature_name: str, impact: float) -> str:
+        """Generate human-readable explanation for the top feature"""
+        base_text = _EXPLANATIONS.get(feature_name, f'Unusual {feature_name}')
         
         if impact > 0:
             return f"{base_text} (contributing to anomaly)"
@@ -183,16 +229,7 @@ class AnomalyDetector:
         if 'top_factors' not in explanation:
             return 'unknown'
         
-        top_factor = explanation['top_factors'][0]['feature']
-        
-        if top_factor in ['signal_count', 'avg_severity']:
-            return 'sudden_activity_spike'
-        elif top_factor == 'risk_score':
-            return 'risk_score_outlier'
-        elif top_factor in ['day_of_week', 'hour_of_day']:
-            return 'temporal_anomaly'
-        else:
-            return 'unknown'
+        return _ROOT_CAUSE.get(explanation['top_factors'][0]['feature'], 'unknown')
     
     def _check_false_positive(self, data: Dict) -> bool:
         """Check if anomaly is likely false positive"""
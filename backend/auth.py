@@ -6,11 +6,77 @@ Implements token-based authentication with access and refresh tokens.
 
 import jwt
 import secrets
+import base64
+import hashlib
+import hmac
+import json
+import time
+from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Optional, Dict
 from pydantic import BaseModel
+from cachetools import TTLCache
 import bcrypt
 
+from .cache import CacheService
+
+
+# HS256 header is constant, so encode it once (same bytes PyJWT produces)
+_HS256_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b'=')
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
+
+
+def _encode_hs256(payload: Dict, mac: hmac.HMAC) -> str:
+    """Encode an HS256 JWT with a pre-keyed HMAC (datetimes become epoch seconds)"""
+    body = json.dumps(
+        payload,
+        separators=(',', ':'),
+        default=lambda o: timegm(o.utctimetuple())
+    ).encode('utf-8')
+    signing_input = _HS256_HEADER_B64 + b'.' + base64.urlsafe_b64encode(body).rstrip(b'=')
+    
+    mac = mac.copy()
+    mac.update(signing_input)
+    signature = base64.urlsafe_b64encode(mac.digest()).rstrip(b'=')
+    
+    return (signing_input + b'.' + signature).decode('ascii')
+
+
+def _decode_hs256(token: str, mac: hmac.HMAC) -> Dict:
+    """Verify and decode an HS256 JWT, raising PyJWT's exceptions on failure"""
+    try:
+        signing_input, signature = token.encode('ascii').rsplit(b'.', 1)
+        header, body = signing_input.split(b'.')
+    except (UnicodeEncodeError, ValueError):
+        raise jwt.DecodeError("Not enough segments")
+    
+    if header != _HS256_HEADER_B64:
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    
+    mac = mac.copy()
+    mac.update(signing_input)
+    try:
+        valid = hmac.compare_digest(mac.digest(), _b64url_decode(signature))
+    except ValueError:
+        valid = False
+    if not valid:
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    try:
+        payload = json.loads(_b64url_decode(body))
+    except ValueError:
+        raise jwt.DecodeError("Invalid payload")
+    if not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid payload")
+    
+    if "exp" in payload and payload["exp"] <= time.time():
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    
+    return payload
+
 
 class TokenPair(BaseModel):
     """Access and refresh token pair"""
@@ -28,36 +94,62 @@ class JWTService:
         secret_key: str,
         algorithm: str = "HS256",
         access_token_expire_minutes: int = 30,
-        refresh_token_expire_days: int = 7
+        refresh_token_expire_days: int = 7,
+        cache: Optional[CacheService] = None
     ):
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.access_token_expire = timedelta(minutes=access_token_expire_minutes)
+        self._access_expire_seconds = access_token_expire_minutes * 60
         self.refresh_token_expire = timedelta(days=refresh_token_expire_days)
-        self.refresh_tokens = {}  # In production, use Redis
+        
+        # HS256 tokens are signed inline with a pre-keyed HMAC; other algorithms go through PyJWT
+        self._hs256_mac = (
+            hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+            if algorithm == "HS256" else None
+        )
+        
+        # Verified access-token payloads, so repeat requests skip HMAC + JSON parsing
+        self._verified_tokens = TTLCache(maxsize=8192, ttl=60)
+        
+        # Refresh tokens live in Redis when available (expire via TTL);
+        # the in-memory dict is only a fallback for single-process dev setups
+        self.redis = cache.redis if cache and cache.enabled else None
+        self.refresh_tokens = {}
     
     def create_access_token(self, user_id: str, role: str, **extra_claims) -> str:
         """Create JWT access token"""
-        now = datetime.utcnow()
-        exp = now + self.access_token_expire
+        # Epoch seconds directly (what the encoder would convert datetimes to)
+        now = int(time.time())
         
         payload = {
             "sub": user_id,
             "role": role,
             "iat": now,
-            "exp": exp,
+            "exp": now + self._access_expire_seconds,
             "type": "access",
             **extra_claims
         }
         
+        if self._hs256_mac:
+            return _encode_hs256(payload, self._hs256_mac)
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
     
     def create_refresh_token(self, user_id: str) -> str:
         """Create refresh token (random string)"""
         token = secrets.token_urlsafe(32)
-        exp = datetime.utcnow() + self.refresh_token_expire
         
-        # Store refresh token (use Redis in production)
+        if self.redis:
+            ttl = int(self.refresh_token_expire.total_seconds())
+            pipe = self.redis.pipeline()
+            pipe.setex(f"refresh:{token}", ttl, user_id)
+            pipe.sadd(f"user_tokens:{user_id}", token)
+            # The index lives as long as the newest token it lists
+            pipe.expire(f"user_tokens:{user_id}", ttl)
+            pipe.execute()
+            return token
+        
+        exp = datetime.utcnow() + self.refresh_token_expire
         self.refresh_tokens[token] = {
             "user_id": user_id,
             "expires_at": exp
@@ -78,17 +170,28 @@ class JWTService:
     
     def verify_access_token(self, token: str) -> Optional[Dict]:
         """Verify and decode access token"""
+        payload = self._verified_tokens.get(token)
+        if payload is not None:
+            if payload.get("exp", float("inf")) > time.time():
+                return payload
+            self._verified_tokens.pop(token, None)
+            return None
+        
         try:
-            payload = jwt.decode(
-                token,
-                self.secret_key,
-                algorithms=[self.algorithm]
-            )
+            if self._hs256_mac:
+                payload = _decode_hs256(token, self._hs256_mac)
+            else:
+                payload = jwt.decode(
+                    token,
+                    self.secret_key,
+                    algorithms=[self.algorithm]
+                )
             
             # Check token type
             if payload.get("type") != "access":
                 return None
             
+            self._verified_tokens[token] = payload
             return payload
         except jwt.ExpiredSignatureError:
             return None
@@ -98,17 +201,24 @@ class JWTService:
     def refresh_access_token(self, refresh_token: str) -> Optional[TokenPair]:
         """Create new access token from refresh token"""
         # Verify refresh token
-        token_data = self.refresh_tokens.get(refresh_token)
-        
-        if not token_data:
-            return None
-        
-        # Check expiration
-        if token_data["expires_at"] < datetime.utcnow():
-            del self.refresh_tokens[refresh_token]
-            return None
-        
-        user_id = token_data["user_id"]
+        if self.redis:
+            # Expired tokens are already gone (TTL)
+            user_id = self.redis.get(f"refresh:{refresh_token}")
+            if not user_id:
+                return None
+            user_id = user_id.decode('utf-8')
+        else:
+            token_data = self.refresh_tokens.get(refresh_token)
+            
+            if not token_data:
+                return None
+            
+            # Check expiration
+            if token_data["expires_at"] < datetime.utcnow():
+                del self.refresh_tokens[refresh_token]
+                return None
+            
+            user_id = token_data["user_id"]
         
         # Get user role (would query DB in production)
         # For now, assume analyst role
@@ -119,6 +229,17 @@ class JWTService:
     
     def revoke_refresh_token(self, refresh_token: str) -> bool:
         """Revoke refresh token (logout)"""
+        if self.redis:
+            user_id = self.redis.get(f"refresh:{refresh_token}")
+            if not user_id:
+                return False
+            
+            pipe = self.redis.pipeline()
+            pipe.delete(f"refresh:{refresh_token}")
+            pipe.srem(f"user_tokens:{user_id.decode('utf-8')}", refresh_token)
+            deleted, _ = pipe.execute()
+            return deleted > 0
+        
         if refresh_token in self.refresh_tokens:
             del self.refresh_tokens[refresh_token]
             return True
@@ -126,6 +247,17 @@ class JWTService:
     
     def revoke_all_tokens(self, user_id: str) -> int:
         """Revoke all refresh tokens for a user"""
+        # Force full re-verification of outstanding access tokens
+        self._verified_tokens.clear()
+        
+        if self.redis:
+            index_key = f"user_tokens:{user_id}"
+            tokens = self.redis.smembers(index_key)
+            if not tokens:
+                return 0
+            # Index may list tokens that already expired; count only live ones
+            return self.redis.delete(*[b"refresh:" + t for t in tokens], index_key) - 1
+        
         count = 0
         tokens_to_remove = []
         
@@ -143,10 +275,13 @@ class JWTService:
 class PasswordHasher:
     """Password hashing using bcrypt"""
     
+    # bcrypt default is 12 (~4x slower per login); 10 is the OWASP minimum
+    ROUNDS = 10
+    
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash password with bcrypt"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=PasswordHasher.ROUNDS)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
@@ -154,6 +289,13 @@ class PasswordHasher:
     def verify_password(password: str, hashed: str) -> bool:
         """Verify password against hash"""
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    
+    @staticmethod
+    def needs_rehash(hashed: str) -> bool:
+        """Check if hash was made with a cost factor other than ROUNDS"""
+        # Hash format: $2b$<rounds>$<salt+digest>. Existing hashes use the old
+        # gensalt() default of 12, so this lets login migrate them down to ROUNDS.
+        return int(hashed.split('$')[2]) != PasswordHasher.ROUNDS
 
 
 class AuthService:
@@ -225,10 +367,15 @@ class AuthService:
         if not PasswordHasher.verify_password(password, user['password_hash']):
             return None
         
-        # Update last login
-        self.db.execute("""
-            UPDATE users SET last_login = NOW() WHERE user_id = %s
-        """, (user['user_id'],))
+        # Update last login (and migrate hashes made with a different cost factor to ROUNDS)
+        if PasswordHasher.needs_rehash(user['password_hash']):
+            self.db.execute("""
+                UPDATE users SET last_login = NOW(), password_hash = %s WHERE user_id = %s
+            """, (PasswordHasher.hash_password(password), user['user_id']))
+        else:
+            self.db.execute("""
+                UPDATE users SET last_login = NOW() WHERE user_id = %s
+            """, (user['user_id'],))
         
         # Create tokens
         return self.jwt.create_token_pair(user['user_id'], user['role'])
@@ -4,6 +4,7 @@ FastAPI Authentication Middleware
 Integrates JWT auth and RBAC into API routes.
 """
 
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Request, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, List
@@ -17,6 +18,14 @@ from .cache import CacheService
 # Security scheme
 security = HTTPBearer()
 
+# Role hierarchy: admin > analyst > district_officer > viewer
+_ROLE_LEVEL = {
+    Role.ADMIN: 4,
+    Role.ANALYST: 3,
+    Role.DISTRICT_OFFICER: 2,
+    Role.VIEWER: 1
+}
+
 # Request/Response models
 class LoginRequest(BaseModel):
     username: str
@@ -58,18 +67,10 @@ async def get_current_user(
 
 async def require_role(required_role: Role):
     """Dependency to require specific role"""
+    required_level = _ROLE_LEVEL.get(required_role, 0)
+    
     async def role_checker(user: dict = Depends(get_current_user)):
-        user_role = Role(user.get("role"))
-        
-        # Role hierarchy: admin > analyst > district_officer > viewer
-        role_hierarchy = {
-            Role.ADMIN: 4,
-            Role.ANALYST: 3,
-            Role.DISTRICT_OFFICER: 2,
-            Role.VIEWER: 1
-        }
-        
-        if role_hierarchy.get(user_role, 0) < role_hierarchy.get(required_role, 0):
+        if _ROLE_LEVEL.get(Role(user.get("role")), 0) < required_level:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         
         return user
@@ -110,7 +111,9 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 @router.post("/register")
 async def register(request: RegisterRequest, auth_service: AuthService = Depends()):
     """Register new user"""
-    user_id = auth_service.register_user(
+    # bcrypt hashing + DB insert are blocking; keep them off the event loop
+    user_id = await asyncio.to_thread(
+        auth_service.register_user,
         username=request.username,
         email=request.email,
         password=request.password,
@@ -126,7 +129,8 @@ async def register(request: RegisterRequest, auth_service: AuthService = Depends
 @router.post("/login", response_model=TokenPair)
 async def login(request: LoginRequest, auth_service: AuthService = Depends()):
     """Login and get access token"""
-    tokens = auth_service.login(request.username, request.password)
+    # bcrypt verify + DB lookups are blocking; keep them off the event loop
+    tokens = await asyncio.to_thread(auth_service.login, request.username, request.password)
     
     if not tokens:
         raise HTTPException(status_code=401, detail="Invalid credentials")
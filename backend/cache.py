@@ -4,15 +4,30 @@ Redis Caching Layer
 Multi-layer caching strategy for performance optimization.
 """
 
+import socket
+import threading
 import redis
-import json
-from typing import Optional, Any, Callable
+import orjson
+from typing import Optional, Any, Callable, Dict, List
 from datetime import timedelta
+from fnmatch import fnmatchcase
 from functools import wraps
+from cachetools import TTLCache
+
+
+# numpy scalars (e.g. from the ML services) and int keys serialize like json did
+_ORJSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Probe idle connections after 30s, every 10s, drop after 3 misses (where the OS supports it)
+_KEEPALIVE_OPTIONS = {
+    getattr(socket, name): value
+    for name, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name)
+}
 
 
 class CacheService:
-    """Redis caching service"""
+    """Redis caching service with an in-process L1 in front of it"""
     
     # Cache TTL configurations
     TTL_CONFIG = {
@@ -23,14 +38,30 @@ class CacheService:
         'user_permissions': 1800,  # 30 minutes
     }
     
-    def __init__(self, redis_url: str = 'redis://localhost:6379'):
+    def __init__(self, redis_url: str = 'redis://localhost:6379', max_connections: int = 64):
         """Initialize Redis connection"""
+        # L1: hot keys served from process memory; 30s TTL bounds staleness across workers.
+        # It holds the same orjson bytes as Redis, so every hit is a fresh, JSON-typed copy
+        self._l1 = TTLCache(maxsize=2048, ttl=30)
+        # cachetools caches are not thread-safe and sync callers run on the threadpool
+        self._l1_lock = threading.Lock()
+        
         try:
-            self.redis = redis.from_url(redis_url, decode_responses=True)
+            # Bounded pool: bursts wait for a free connection instead of opening new sockets
+            self.pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=max_connections,
+                socket_keepalive=True,
+                socket_keepalive_options=_KEEPALIVE_OPTIONS,
+                health_check_interval=30,
+                decode_responses=False  # Raw bytes: orjson parses them directly
+            )
+            self.redis = redis.Redis(connection_pool=self.pool)
             self.redis.ping()
             self.enabled = True
         except Exception as e:
             print(f"Redis connection failed: {e}. Caching disabled.")
+            self.pool = None
             self.redis = None
             self.enabled = False
     
@@ -39,10 +70,17 @@ class CacheService:
         if not self.enabled:
             return None
         
+        with self._l1_lock:
+            value = self._l1.get(key)
+        if value is not None:
+            return orjson.loads(value)
+        
         try:
             value = self.redis.get(key)
             if value:
-                return json.loads(value)
+                with self._l1_lock:
+                    self._l1[key] = value
+                return orjson.loads(value)
             return None
         except Exception as e:
             print(f"Cache get error: {e}")
@@ -64,13 +102,15 @@ class CacheService:
             if cache_type and cache_type in self.TTL_CONFIG:
                 ttl = self.TTL_CONFIG[cache_type]
             
-            serialized = json.dumps(value)
+            serialized = orjson.dumps(value, option=_ORJSON_OPTS)
             
             if ttl:
                 self.redis.setex(key, ttl, serialized)
             else:
                 self.redis.set(key, serialized)
             
+            with self._l1_lock:
+                self._l1[key] = serialized
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -81,6 +121,9 @@ class CacheService:
         if not self.enabled:
             return False
         
+        with self._l1_lock:
+            self._l1.pop(key, None)
+        
         try:
             self.redis.delete(key)
             return True
@@ -93,11 +136,21 @@ class CacheService:
         if not self.enabled:
             return 0
         
+        with self._l1_lock:
+            for key in [k for k in self._l1 if fnmatchcase(k, pattern)]:
+                self._l1.pop(key, None)
+        
         try:
-            keys = self.redis.keys(pattern)
-            if keys:
-                return self.redis.delete(*keys)
-            return 0
+            # SCAN doesn't block Redis like KEYS; UNLINK frees memory in the background
+            count = 0
+            pipe = self.redis.pipeline(transaction=False)
+            for key in self.redis.scan_iter(match=pattern, count=500):
+                pipe.unlink(key)
+                count += 1
+                if count % 500 == 0:
+                    pipe.execute()
+            pipe.execute()
+            return count
         except Exception as e:
             print(f"Cache delete pattern error: {e}")
             return 0
@@ -107,6 +160,9 @@ class CacheService:
         if not self.enabled:
             return False
         
+        with self._l1_lock:
+            self._l1.clear()
+        
         try:
             self.redis.flushdb()
             return True
@@ -126,6 +182,62 @@ class CacheService:
             print(f"Cached risk score for {district}")
         return success
     
+    def get_risk_scores(self, districts: List[str]) -> Dict[str, Optional[dict]]:
+        """Get cached risk scores for several districts in one round-trip"""
+        if not self.enabled:
+            return {district: None for district in districts}
+        
+        results = {}
+        missing = []
+        with self._l1_lock:
+            l1_values = [self._l1.get(f"risk:{district}") for district in districts]
+        for district, value in zip(districts, l1_values):
+            if value is None:
+                results[district] = None
+                missing.append(district)
+            else:
+                results[district] = orjson.loads(value)
+        if not missing:
+            return results
+        
+        try:
+            values = self.redis.mget([f"risk:{district}" for district in missing])
+            with self._l1_lock:
+                for district, value in zip(missing, values):
+                    if value:
+                        self._l1[f"risk:{district}"] = value
+            for district, value in zip(missing, values):
+                if value:
+                    results[district] = orjson.loads(value)
+            return results
+        except Exception as e:
+            print(f"Cache mget error: {e}")
+            return {district: None for district in districts}
+    
+    def set_risk_scores(self, scores: Dict[str, dict]) -> bool:
+        """Cache risk scores for several districts in one round-trip"""
+        if not self.enabled:
+            return False
+        
+        try:
+            ttl = self.TTL_CONFIG['risk_score']
+            serialized = {
+                district: orjson.dumps(data, option=_ORJSON_OPTS)
+                for district, data in scores.items()
+            }
+            pipe = self.redis.pipeline(transaction=False)
+            for district, value in serialized.items():
+                pipe.setex(f"risk:{district}", ttl, value)
+            pipe.execute()
+            
+            with self._l1_lock:
+                for district, value in serialized.items():
+                    self._l1[f"risk:{district}"] = value
+            return True
+        except Exception as e:
+            print(f"Cache set error: {e}")
+            return False
+    
     def invalidate_risk_score(self, district: str) -> bool:
         """Invalidate risk score cache"""
         return self.delete(f"risk:{district}")
@@ -143,11 +255,25 @@ class CacheService:
         return self.delete(f"permissions:{user_id}")
 
 
+# Shared instance for the decorator (one connection pool per process)
+_default_cache: Optional[CacheService] = None
+
+
+def _get_default_cache() -> CacheService:
+    """Create the shared CacheService on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CacheService()
+    return _default_cache
+
+
 # Decorator for automatic caching
-def cached(cache_type: str, key_builder: Callable = None):
+def cached(cache_type: str, key_builder: Callable = None, cache: Optional[CacheService] = None):
     """
     Decorator for automatic function caching
     
+    Pass `cache` to use the app's CacheService; otherwise a shared default is used.
+    
     Example:
         @cached('risk_score', lambda district: f"risk:{district}")
         def get_risk_score(district):
@@ -164,8 +290,8 @@ def cached(cache_type: str, key_builder: Callable = None):
                 cache_key = f"{func.__name__}:{':'.join(map(str, args))}"
             
             # Try to get from cache
-            cache = CacheService()
-            cached_value = cache.get(cache_key)
+            service = cache or _get_default_cache()
+            cached_value = service.get(cache_key)
             
             if cached_value is not None:
                 return cached_value
@@ -174,7 +300,7 @@ def cached(cache_type: str, key_builder: Callable = None):
             result = func(*args, **kwargs)
             
             # Cache result
-            cache.set(cache_key, result, cache_type=cache_type)
+            service.set(cache_key, result, cache_type=cache_type)
             
             return result
         
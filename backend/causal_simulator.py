@@ -4,36 +4,66 @@ Causal "What If" Simulator
 Uses causal inference to predict impact of interventions
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+import time
+import threading
 import numpy as np
+import networkx as nx
 from dowhy import CausalModel
 import pandas as pd
 
+# Fitted effects are reused for this long while the district's data is unchanged
+MODEL_CACHE_TTL_SECONDS = 3600
+
+# Monthly cost per unit of each known intervention, in INR
+COST_KEYS = ('officers_deployed', 'checkpoints', 'surveillance_level')
+COST_PER_UNIT = np.array([
+    50000,  # ₹50k per officer per month
+    200000,  # ₹2L per checkpoint
+    100000  # ₹1L per unit
+], dtype=np.int64)
+DEFAULT_UNIT_COST = 10000
+
+# PCG64 generators for spillover signs, one per thread so threadpool callers
+# never contend on a shared bit generator lock
+_rng_local = threading.local()
+
+
+def _thread_rng() -> np.random.Generator:
+    """This thread's random generator, created (from fresh entropy) on first use"""
+    rng = getattr(_rng_local, 'rng', None)
+    if rng is None:
+        rng = _rng_local.rng = np.random.default_rng()
+    return rng
+
+
 class CausalSimulator:
     """Causal inference for intervention impact prediction"""
     
+    # DAG: Actions → Layers → Risk Score. Built once as a DiGraph so DoWhy
+    # does not re-parse a DOT string for every CausalModel
+    _CAUSAL_GRAPH = nx.DiGraph([
+        ('officers_deployed', 'physical_layer'),
+        ('surveillance_level', 'cognitive_layer'),
+        ('checkpoints', 'physical_layer'),
+        
+        ('physical_layer', 'risk_score'),
+        ('cognitive_layer', 'risk_score'),
+        ('cyber_layer', 'risk_score'),
+        
+        ('festival_season', 'cognitive_layer'),
+        ('recent_incidents', 'all_layers'),
+    ])
+    
     def __init__(self, db_connection):
         self.db = db_connection
         self.causal_graph = self._build_causal_graph()
+        # (district, treatment) -> (data version, fitted_at, (effect, current_risk, std_error))
+        self._model_cache: Dict[Tuple[str, str], Tuple[Tuple, float, Tuple[float, float, float]]] = {}
     
-    def _build_causal_graph(self) -> str:
+    def _build_causal_graph(self) -> nx.DiGraph:
         """Define causal relationships"""
-        # DAG: Actions → Layers → Risk Score
-        graph = """
-        digraph {
-            officers_deployed -> physical_layer;
-            surveillance_level -> cognitive_layer;
-            checkpoints -> physical_layer;
-            
-            physical_layer -> risk_score;
-            cognitive_layer -> risk_score;
-            cyber_layer -> risk_score;
-            
-            festival_season -> cognitive_layer;
-            recent_incidents -> all_layers;
-        }
-        """
-        return graph
+        return self._CAUSAL_GRAPH
     
     def simulate_intervention(
         self,
@@ -50,47 +80,23 @@ class CausalSimulator:
         Returns:
             Predicted outcomes with confidence intervals
         """
-        # Get historical data
-        data = self._get_historical_data(district)
-        
-        if len(data) < 30:
-            return self._fallback_prediction(intervention)
-        
-        # Create DataFrame
-        df = pd.DataFrame(data)
-        
         # Define treatment and outcome
         treatment = list(intervention.keys())[0]  # Primary intervention
         outcome = 'risk_score'
         
         try:
-            # Create causal model
-            model = CausalModel(
-                data=df,
-                treatment=treatment,
-                outcome=outcome,
-                graph=self.causal_graph
-            )
-            
-            # Identify causal effect
-            identified_estimand = model.identify_effect()
-            
-            # Estimate effect
-            estimate = model.estimate_effect(
-                identified_estimand,
-                method_name="backdoor.linear_regression"
-            )
+            fit = self._fit_effect(district, treatment, outcome)
+            if fit is None:
+                return self._fallback_prediction(intervention)
             
-            # Calculate predicted risk after intervention
-            current_risk = df[outcome].iloc[-1]
+            effect, current_risk, std_error = fit
             intervention_value = intervention[treatment]
             
             # Effect size
-            effect_size = estimate.value * intervention_value
+            effect_size = effect * intervention_value
             predicted_risk = max(0, current_risk + effect_size)
             
             # Confidence interval (simplified)
-            std_error = np.std(df[outcome]) / np.sqrt(len(df))
             confidence_interval = (
                 max(0, predicted_risk - 1.96 * std_error),
                 min(100, predicted_risk + 1.96 * std_error)
@@ -104,7 +110,7 @@ class CausalSimulator:
                 'predicted_risk': round(predicted_risk, 1),
                 'confidence_interval': [round(confidence_interval[0], 1), round(confidence_interval[1], 1)],
                 'risk_reduction': round(current_risk - predicted_risk, 1),
-                'effect_probability': round(abs(estimate.value) * 100, 1),
+                'effect_probability': round(abs(effect) * 100, 1),
                 'cost_estimate': self._estimate_cost(intervention),
                 'side_effects': side_effects,
                 'recommendation': self._generate_recommendation(predicted_risk, current_risk)
@@ -114,23 +120,98 @@ class CausalSimulator:
             print(f"Causal inference failed: {e}")
             return self._fallback_prediction(intervention)
     
+    def _fit_effect(
+        self,
+        district: str,
+        treatment: str,
+        outcome: str
+    ) -> Optional[Tuple[float, float, float]]:
+        """
+        Estimate (per-unit effect, current risk, std error) for a treatment
+        
+        The fit is reused without reloading history or re-running DoWhy until new
+        risk scores arrive for the district. Returns None with under 30 days of data.
+        """
+        key = (district, treatment)
+        version = self._data_version(district)
+        cached = self._model_cache.get(key)
+        if cached and cached[0] == version and time.time() - cached[1] < MODEL_CACHE_TTL_SECONDS:
+            return cached[2]
+        
+        # Get historical data
+        data = self._get_historical_data(district)
+        
+        if len(data) < 30:
+            return None
+        
+        df = pd.DataFrame(data)
+        
+        # Create causal model
+        model = CausalModel(
+            data=df,
+            treatment=treatment,
+            outcome=outcome,
+            graph=self.causal_graph
+        )
+        
+        # Identify causal effect
+        identified_estimand = model.identify_effect()
+        
+        # Estimate effect
+        estimate = model.estimate_effect(
+            identified_estimand,
+            method_name="backdoor.linear_regression"
+        )
+        
+        current_risk = float(df[outcome].iloc[-1])
+        std_error = float(np.std(df[outcome]) / np.sqrt(len(df)))
+        
+        fit = (float(estimate.value), current_risk, std_error)
+        self._model_cache[key] = (version, time.time(), fit)
+        return fit
+    
+    def _data_version(self, district: str) -> Tuple:
+        """Latest risk score date and row count: changes whenever a new day is scored"""
+        row = self.db.query_one("""
+            SELECT MAX(date) as last_date, COUNT(*) as count
+            FROM risk_scores
+            WHERE district = %s
+        """, (district,))
+        return (row['last_date'], row['count'])
+    
     def _get_historical_data(self, district: str) -> List[Dict]:
         """Get historical data for causal analysis"""
         results = self.db.query("""
+            WITH act AS (
+                SELECT 
+                    created_at::date as d,
+                    COUNT(*) FILTER (WHERE action_type = 'deploy_officers') as officers_deployed,
+                    COUNT(*) FILTER (WHERE action_type = 'setup_checkpoints') as checkpoints
+                FROM actions
+                WHERE district = %s
+                GROUP BY created_at::date
+            ),
+            sig AS (
+                SELECT 
+                    DATE(timestamp) as d,
+                    AVG(severity_score) as avg_severity
+                FROM signals
+                WHERE district = %s
+                GROUP BY DATE(timestamp)
+            )
             SELECT 
-                date,
-                score as risk_score,
-                (SELECT COUNT(*) FROM actions WHERE district = %s AND action_type = 'deploy_officers' 
-                 AND created_at::date = rs.date) as officers_deployed,
-                (SELECT COUNT(*) FROM actions WHERE district = %s AND action_type = 'setup_checkpoints' 
-                 AND created_at::date = rs.date) as checkpoints,
-                (SELECT AVG(severity_score) FROM signals WHERE district = %s 
-                 AND DATE(timestamp) = rs.date) as avg_severity
+                rs.date,
+                rs.score as risk_score,
+                COALESCE(act.officers_deployed, 0) as officers_deployed,
+                COALESCE(act.checkpoints, 0) as checkpoints,
+                sig.avg_severity
             FROM risk_scores rs
-            WHERE district = %s
-            ORDER BY date DESC
+            LEFT JOIN act ON act.d = rs.date
+            LEFT JOIN sig ON sig.d = rs.date
+            WHERE rs.district = %s
+            ORDER BY rs.date DESC
             LIMIT 90
-        """, (district, district, district, district))
+        """, (district, district, district))
         
         return results
     
@@ -156,18 +237,18 @@ class CausalSimulator:
         # Get adjacent districts
         adjacent = self._get_adjacent_districts(district)
         
-        effects = []
-        for adj_district in adjacent:
-            # Spillover effect (usually smaller, sometimes negative)
-            spillover = intervention_strength * 0.15 * np.random.choice([-1, 1])
-            
-            effects.append({
+        # Spillover effect (usually smaller, sometimes negative), drawn for all neighbours at once
+        signs = np.where(_thread_rng().random(len(adjacent)) < 0.5, -1.0, 1.0)
+        spillovers = (intervention_strength * 0.15 * signs).round(1)
+        
+        return [
+            {
                 'district': adj_district,
-                'predicted_change': round(spillover, 1),
+                'predicted_change': float(spillover),
                 'type': 'decrease' if spillover < 0 else 'increase'
-            })
-        
-        return effects
+            }
+            for adj_district, spillover in zip(adjacent, spillovers)
+        ]
     
     def _get_adjacent_districts(self, district: str) -> List[str]:
         """Get geographically adjacent districts"""
@@ -181,15 +262,11 @@ class CausalSimulator:
     
     def _estimate_cost(self, intervention: Dict) -> Dict:
         """Estimate financial cost of intervention"""
-        cost_per_unit = {
-            'officers_deployed': 50000,  # ₹50k per officer per month
-            'checkpoints': 200000,  # ₹2L per checkpoint
-            'surveillance_level': 100000  # ₹1L per unit
-        }
-        
-        total_cost = sum(
-            cost_per_unit.get(key, 10000) * value 
+        values = np.array([intervention.get(key, 0) for key in COST_KEYS])
+        total_cost = (COST_PER_UNIT @ values).item() + sum(
+            DEFAULT_UNIT_COST * value
             for key, value in intervention.items()
+            if key not in COST_KEYS
         )
         
         return {
@@ -3,41 +3,63 @@ CSV Batch Ingestion Script for NE-NETRA
 Processes CSV files containing incident data and ingests them into the system
 """
 
-import csv
+import re
 import sys
+import asyncio
+import itertools
 from datetime import datetime
 from pathlib import Path
-import requests
-from typing import List, Dict
+import aiohttp
+import orjson
+import pandas as pd
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
 from incident_ingestion import IncidentIngestionModule, ProcessedSignal
 
 
-def parse_timestamp(timestamp_str: str) -> datetime:
-    """Parse timestamp from various formats"""
-    formats = [
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d",
-        "%d-%m-%Y %H:%M:%S",
-        "%d-%m-%Y",
-        "%d/%m/%Y %H:%M:%S",
-        "%d/%m/%Y",
-    ]
+# Accepted timestamp shapes: ISO or day-first date, optional HH:MM[:SS] time
+_TIMESTAMP_RE = re.compile(
+    r'^(?:(?P<iso>\d{4}-\d{1,2}-\d{1,2})|\d{1,2}(?P<sep>[-/])\d{1,2}(?P=sep)\d{4})'
+    r'(?P<time> \d{1,2}:\d{1,2}(?P<sec>:\d{1,2})?)?$'
+)
+
+# (date style, time precision) -> the one format that can parse it
+_FORMAT_BY_SHAPE = {
+    ('iso', 'seconds'): "%Y-%m-%d %H:%M:%S",
+    ('iso', 'minutes'): "%Y-%m-%d %H:%M",
+    ('iso', 'date'): "%Y-%m-%d",
+    ('-', 'seconds'): "%d-%m-%Y %H:%M:%S",
+    ('-', 'date'): "%d-%m-%Y",
+    ('/', 'seconds'): "%d/%m/%Y %H:%M:%S",
+    ('/', 'date'): "%d/%m/%Y",
+}
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Parse a column of timestamp strings from various formats (NaT if none match)"""
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    
+    # Classify each value once by shape, then parse each group with its single format
+    shape = values.str.extract(_TIMESTAMP_RE)
+    date_style = shape['sep'].where(shape['iso'].isna(), 'iso')
+    precision = pd.Series('date', index=values.index)
+    precision[shape['time'].notna()] = 'minutes'
+    precision[shape['sec'].notna()] = 'seconds'
     
-    for fmt in formats:
-        try:
-            return datetime.strptime(timestamp_str, fmt)
-        except ValueError:
-            continue
+    formats = pd.Series(
+        [_FORMAT_BY_SHAPE.get(key) for key in zip(date_style, precision)],
+        index=values.index,
+        dtype=object
+    )
     
-    # Default to now if parsing fails
-    print(f"Warning: Could not parse timestamp '{timestamp_str}', using current time")
-    return datetime.now()
+    for fmt, group in values.groupby(formats):
+        parsed[group.index] = pd.to_datetime(group, format=fmt, errors="coerce")
+    
+    return parsed
 
 
-def load_csv(file_path: str) -> List[Dict]:
+def iter_csv(file_path: str, chunk_size: int = 500) -> Iterator[List[Dict]]:
     """
-    Load incidents from CSV file
+    Stream incidents from CSV file, one chunk of rows at a time
     
     Expected CSV columns:
     - state (required)
@@ -47,67 +69,244 @@ def load_csv(file_path: str) -> List[Dict]:
     - timestamp (optional, will use current time if missing)
     - source_url (optional)
     """
-    incidents = []
+    try:
+        # index_col=False: a stray extra comma must not turn the first column into the index
+        reader = pd.read_csv(
+            file_path,
+            dtype=str,
+            keep_default_na=False,
+            encoding='utf-8',
+            chunksize=chunk_size,
+            index_col=False,
+            engine='python',
+            on_bad_lines=_keep_bad_line
+        )
+    except pd.errors.EmptyDataError:
+        return  # Empty file: no rows
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 (after header)
-            try:
-                # Required fields
-                if not row.get('state') or not row.get('district') or not row.get('event_summary'):
-                    print(f"Row {row_num}: Missing required fields (state, district, event_summary)")
-                    continue
-                
-                incident = {
-                    'state': row['state'],
-                    'district': row['district'],
-                    'event_summary': row['event_summary'],
-                    'location': row.get('location', '').strip() or None,
-                    'timestamp': parse_timestamp(row['timestamp']) if row.get('timestamp') else datetime.now(),
-                    'source_url': row.get('source_url', '').strip() or None,
-                }
-                
-                incidents.append(incident)
-                
-            except Exception as e:
-                print(f"Row {row_num}: Error processing - {e}")
-                continue
+    with reader:
+        for df in reader:
+            df = df.fillna('')  # Short rows leave trailing fields missing
+            df.index += 2  # CSV row numbers (after header)
+            yield _chunk_to_incidents(df)
+
+
+def _keep_bad_line(fields: List[str]) -> List[str]:
+    """Keep rows with extra fields; pandas drops the extras (as csv.DictReader ignored them)"""
+    return fields
+
+
+def _chunk_to_incidents(df: pd.DataFrame) -> List[Dict]:
+    """Validate a chunk of CSV rows and convert them to incident dicts"""
+    for column in ('state', 'district', 'event_summary', 'location', 'timestamp', 'source_url'):
+        if column not in df:
+            df[column] = ''
+    
+    # Required fields
+    valid = (df['state'] != '') & (df['district'] != '') & (df['event_summary'] != '')
+    for row_num in df.index[~valid]:
+        print(f"Row {row_num}: Missing required fields (state, district, event_summary)")
+    df = df[valid]
+    
+    now = datetime.now()
+    has_timestamp = df['timestamp'] != ''
+    timestamps = parse_timestamps(df['timestamp'].where(has_timestamp))
+    
+    for row_num in df.index[has_timestamp & timestamps.isna()]:
+        print(f"Warning: Could not parse timestamp '{df.at[row_num, 'timestamp']}', using current time")
+    
+    location = df['location'].str.strip()
+    source_url = df['source_url'].str.strip()
+    
+    return [
+        {
+            'state': state,
+            'district': district,
+            'event_summary': event_summary,
+            'location': loc or None,
+            'timestamp': ts.to_pydatetime() if not pd.isna(ts) else now,
+            'source_url': url or None,
+        }
+        for state, district, event_summary, loc, ts, url in zip(
+            df['state'], df['district'], df['event_summary'], location, timestamps, source_url
+        )
+    ]
+
+
+def load_csv(file_path: str) -> List[Dict]:
+    """Load all incidents from CSV file (see iter_csv for the expected columns)"""
+    incidents = [incident for chunk in iter_csv(file_path) for incident in chunk]
     
     print(f"\nLoaded {len(incidents)} valid incidents from CSV")
     return incidents
 
 
-def ingest_to_backend(signals: List[ProcessedSignal], backend_url: str = "http://localhost:8000"):
-    """Send processed signals to NE-NETRA backend"""
+# Signals per /ingest_batch request, and max requests in flight at once
+BATCH_SIZE = 500
+MAX_CONCURRENT_REQUESTS = 8
+
+
+def _signal_payload(signal: ProcessedSignal) -> Dict:
+    """Convert to format expected by the ingest endpoints"""
+    return {
+        "district": signal.district,
+        "text": signal.event_summary,
+        "source_type": signal.source_type,
+        "geo_sensitivity": signal.geo_sensitivity[0].value if signal.geo_sensitivity else "medium",
+        "timestamp": signal.timestamp.isoformat(),
+    }
+
+
+async def _post_batch(
+    session: aiohttp.ClientSession,
+    url: str,
+    batch: List[ProcessedSignal]
+) -> int:
+    """POST one chunk of signals to /ingest_batch, returning how many were ingested"""
+    payload = {"signals": [_signal_payload(signal) for signal in batch]}
+    
+    try:
+        async with session.post(url, json=payload) as response:
+            if response.status != 200:
+                print(f"✗ Failed: batch of {len(batch)} - Status {response.status}")
+                return 0
+            results = (await response.json())["results"]
+            
+    except Exception as e:
+        print(f"✗ Error: batch of {len(batch)} - {e}")
+        return 0
+    
     success_count = 0
-    error_count = 0
+    for signal, result in zip(batch, results):
+        if result.get("status") == "success":
+            success_count += 1
+            print(f"✓ Ingested: {signal.district} - {signal.event_summary[:50]}...")
+        else:
+            print(f"✗ Failed: {signal.district} - {result.get('status')}")
     
+    return success_count
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """One keep-alive connection pool for all batch posts"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=64, keepalive_timeout=30),
+        timeout=aiohttp.ClientTimeout(total=120)
+    )
+
+
+async def _post_worker(session: aiohttp.ClientSession, queue: asyncio.Queue, url: str) -> int:
+    """Post queued chunks until a None sentinel arrives; returns signals ingested"""
+    success_count = 0
+    while (batch := await queue.get()) is not None:
+        success_count += await _post_batch(session, url, batch)
+    return success_count
+
+
+async def _post_all(
+    session: aiohttp.ClientSession,
+    queue: asyncio.Queue,
+    backend_url: str
+) -> int:
+    """Run MAX_CONCURRENT_REQUESTS workers draining the queue"""
+    results = await asyncio.gather(*[
+        _post_worker(session, queue, f"{backend_url}/ingest_batch")
+        for _ in range(MAX_CONCURRENT_REQUESTS)
+    ])
+    return sum(results)
+
+
+async def _ingest_all(signals: List[ProcessedSignal], backend_url: str) -> Tuple[int, int]:
+    """Send signals in chunks, concurrently over one keep-alive connection pool"""
+    queue = asyncio.Queue()
+    for i in range(0, len(signals), BATCH_SIZE):
+        queue.put_nowait(signals[i:i + BATCH_SIZE])
+    for _ in range(MAX_CONCURRENT_REQUESTS):
+        queue.put_nowait(None)
+    
+    async with _create_session() as session:
+        success_count = await _post_all(session, queue, backend_url)
+    
+    return success_count, len(signals) - success_count
+
+
+def ingest_to_backend(signals: List[ProcessedSignal], backend_url: str = "http://localhost:8000"):
+    """Send processed signals to NE-NETRA backend"""
+    return asyncio.run(_ingest_all(signals, backend_url))
+
+
+def _new_summary() -> Dict:
+    """Running counts for the classification summary"""
+    return {
+        "incidents": 0,
+        "signals": 0,
+        "ingested": 0,
+        "risk_layers": {"cognitive": 0, "network": 0, "physical": 0},
+        "polarity": {"escalatory": 0, "stabilizing": 0, "neutral": 0},
+        "severity": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+    }
+
+
+def _tally(summary: Dict, signals: List[ProcessedSignal]):
+    """Add a chunk of signals to the running summary"""
+    summary["signals"] += len(signals)
     for signal in signals:
-        try:
-            # Convert to format expected by /ingest endpoint
-            payload = {
-                "district": signal.district,
-                "text": signal.event_summary,
-                "source_type": signal.source_type,
-                "geo_sensitivity": signal.geo_sensitivity[0].value if signal.geo_sensitivity else "medium",
-                "timestamp": signal.timestamp.isoformat(),
-            }
-            
-            response = requests.post(f"{backend_url}/ingest", json=payload)
-            
-            if response.status_code == 200:
-                success_count += 1
-                print(f"✓ Ingested: {signal.district} - {signal.event_summary[:50]}...")
-            else:
-                error_count += 1
-                print(f"✗ Failed: {signal.district} - Status {response.status_code}")
+        for layer in signal.risk_layers:
+            summary["risk_layers"][layer.value] += 1
+        summary["polarity"][signal.polarity.value] += 1
+        summary["severity"][signal.severity_score] += 1
+
+
+async def stream_csv_to_backend(
+    chunks: Iterable[List[Dict]],
+    backend_url: str,
+    ingestion_module: IncidentIngestionModule,
+    audit_file: str
+) -> Dict:
+    """
+    Classify and post incident chunks (e.g. from iter_csv) one at a time
+    
+    Only a bounded number of chunks is held in memory: reading/classifying the
+    next chunk (in a worker thread) overlaps with posting the previous ones.
+    Processed signals are appended to the audit JSON file as they are produced.
+    """
+    summary = _new_summary()
+    queue = asyncio.Queue(maxsize=MAX_CONCURRENT_REQUESTS * 2)
+    chunks = iter(chunks)
+    
+    def next_chunk() -> Optional[Tuple[List[Dict], List[ProcessedSignal]]]:
+        incidents = next(chunks, None)
+        if incidents is None:
+            return None
+        return incidents, list(ingestion_module.process_stream(incidents))
+    
+    async def produce():
+        with open(audit_file, 'wb') as f:
+            f.write(b"[")
+            first = True
+            while (chunk := await asyncio.to_thread(next_chunk)) is not None:
+                incidents, signals = chunk
+                summary["incidents"] += len(incidents)
+                _tally(summary, signals)
                 
-        except Exception as e:
-            error_count += 1
-            print(f"✗ Error: {signal.district} - {e}")
+                for entry in ingestion_module.export_for_storage(signals):
+                    f.write((b"\n" if first else b",\n") + orjson.dumps(entry, option=orjson.OPT_INDENT_2))
+                    first = False
+                
+                if signals:
+                    await queue.put(signals)
+            f.write(b"\n]\n")
+        
+        for _ in range(MAX_CONCURRENT_REQUESTS):
+            await queue.put(None)
     
-    return success_count, error_count
+    async with _create_session() as session:
+        _, summary["ingested"] = await asyncio.gather(
+            produce(),
+            _post_all(session, queue, backend_url)
+        )
+    
+    return summary
 
 
 def main():
@@ -135,34 +334,34 @@ def main():
     print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("\n" + "=" * 80)
     
-    # Step 1: Load CSV
-    print("\n[1/4] Loading incidents from CSV...")
-    incidents = load_csv(csv_file)
+    output_file = f"processed_signals_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    
+    # Steps 1-3 run as one pipeline: each CSV chunk is classified and sent
+    # while the next one is being read
+    print("\n[1/3] Streaming incidents from CSV to backend...")
+    print("-" * 80)
     
-    if not incidents:
+    # Read up to the first valid incident before writing the audit file or posting anything
+    chunks = iter_csv(csv_file, chunk_size=BATCH_SIZE)
+    first_chunk = next((chunk for chunk in chunks if chunk), None)
+    if first_chunk is None:
         print("No valid incidents found. Exiting.")
         sys.exit(1)
     
-    # Step 2: Process with ingestion module
-    print(f"\n[2/4] Processing {len(incidents)} incidents...")
     ingestion_module = IncidentIngestionModule()
-    signals = ingestion_module.process_batch(incidents)
+    summary = asyncio.run(stream_csv_to_backend(
+        itertools.chain([first_chunk], chunks), backend_url, ingestion_module, output_file
+    ))
     
-    print(f"Successfully processed: {len(signals)}/{len(incidents)} incidents")
+    print(f"\n[2/3] Successfully processed: {summary['signals']}/{summary['incidents']} incidents")
     
     # Step 3: Display summary
-    print("\n[3/4] Risk Classification Summary:")
+    print("\n[3/3] Risk Classification Summary:")
     print("-" * 80)
     
-    risk_layer_counts = {"cognitive": 0, "network": 0, "physical": 0}
-    polarity_counts = {"escalatory": 0, "stabilizing": 0, "neutral": 0}
-    severity_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    
-    for signal in signals:
-        for layer in signal.risk_layers:
-            risk_layer_counts[layer.value] += 1
-        polarity_counts[signal.polarity.value] += 1
-        severity_counts[signal.severity_score] += 1
+    risk_layer_counts = summary["risk_layers"]
+    polarity_counts = summary["polarity"]
+    severity_counts = summary["severity"]
     
     print(f"Risk Layers:")
     print(f"  Cognitive: {risk_layer_counts['cognitive']}")
@@ -179,27 +378,18 @@ def main():
         bar = "█" * severity_counts[sev]
         print(f"  {sev}/5: {bar} ({severity_counts[sev]})")
     
-    # Step 4: Ingest to backend
-    print(f"\n[4/4] Sending signals to backend...")
-    print("-" * 80)
-    
-    success, errors = ingest_to_backend(signals, backend_url)
+    success = summary["ingested"]
+    total = summary["signals"]
     
     print("\n" + "=" * 80)
     print("INGESTION COMPLETE")
     print("=" * 80)
-    print(f"Total Processed: {len(signals)}")
+    print(f"Total Processed: {total}")
     print(f"Successfully Ingested: {success}")
-    print(f"Errors: {errors}")
-    print(f"Success Rate: {(success/len(signals)*100):.1f}%")
+    print(f"Errors: {total - success}")
+    print(f"Success Rate: {(success/total*100 if total else 0):.1f}%")
     print("=" * 80)
     
-    # Save processed signals to JSON for audit
-    import json
-    output_file = f"processed_signals_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(ingestion_module.export_for_storage(signals), f, indent=2, ensure_ascii=False)
-    
     print(f"\n✓ Audit trail saved to: {output_file}")
 
 
@@ -5,9 +5,15 @@ Auto-ingest signals from social media.
 """
 
 import os
+import re
+from functools import cached_property
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import asyncio
+import numpy as np
+import pandas as pd
+
+from .ai_routes import invalidate_briefing
 
 try:
     import tweepy
@@ -15,6 +21,42 @@ try:
 except ImportError:
     TWEEPY_AVAILABLE = False
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _engagement_severities(likes, retweets):
+    """Severity bucket for each tweet from its engagement (likes + 2 * retweets)"""
+    engagement = likes + 2 * retweets
+    out = np.empty(engagement.size, dtype=np.float32)
+    for i in range(engagement.size):
+        e = engagement[i]
+        if e > 1000:
+            out[i] = 4.5
+        elif e > 500:
+            out[i] = 4.0
+        elif e > 100:
+            out[i] = 3.5
+        else:
+            out[i] = 3.0
+    return out
+
+
+if njit is not None:
+    _engagement_severities = njit(cache=True)(_engagement_severities)
+
 
 class TwitterIngestion:
     """Twitter/X data ingestion service"""
@@ -31,6 +73,8 @@ class TwitterIngestion:
             "Thoubal", "Bishnupur", "Kakching", "Kangpokpi",
             "Senapati", "Ukhrul", "Tamenglong"
         ]
+        self._district_matcher = self._build_district_matcher()
+        self._districts_lower = [(district.lower(), district) for district in self.districts]
         
         if TWEEPY_AVAILABLE and self.bearer_token:
             try:
@@ -66,6 +110,11 @@ class TwitterIngestion:
         
         return query
     
+    @cached_property
+    def search_query(self) -> str:
+        """Search query, built once per client"""
+        return self.build_search_query()
+    
     async def fetch_recent_tweets(
         self,
         max_results: int = 100,
@@ -76,7 +125,7 @@ class TwitterIngestion:
             return []
         
         try:
-            query = self.build_search_query()
+            query = self.search_query
             start_time = datetime.utcnow() - timedelta(hours=hours_ago)
             
             # Search tweets
@@ -91,39 +140,45 @@ class TwitterIngestion:
             if not response.data:
                 return []
             
-            # Convert to signal format
-            signals = []
-            for tweet in response.data:
-                signal = self._tweet_to_signal(tweet)
-                if signal:
-                    signals.append(signal)
-            
-            return signals
+            # Convert to signal format, scoring and locating the whole batch at once
+            severities = self._classify_severities(response.data)
+            districts = self._extract_districts([tweet.text for tweet in response.data])
+            signals = [
+                self._tweet_to_signal(tweet, float(severity), district or "Unknown")
+                for tweet, severity, district in zip(response.data, severities, districts)
+            ]
+            return [s for s in signals if s]
             
         except Exception as e:
             print(f"Twitter fetch failed: {e}")
             return []
     
-    def _tweet_to_signal(self, tweet) -> Optional[Dict]:
+    def _classify_severities(self, tweets) -> np.ndarray:
+        """Engagement severity for a batch of tweets"""
+        n = len(tweets)
+        likes = np.fromiter(((t.public_metrics or {}).get('like_count', 0) for t in tweets), np.int64, n)
+        retweets = np.fromiter(((t.public_metrics or {}).get('retweet_count', 0) for t in tweets), np.int64, n)
+        return _engagement_severities(likes, retweets)
+    
+    def _tweet_to_signal(
+        self,
+        tweet,
+        severity: Optional[float] = None,
+        district: Optional[str] = None
+    ) -> Optional[Dict]:
         """Convert tweet to signal format"""
         try:
-            # Extract location (if available)
-            district = self._extract_district(tweet.text)
-            if not district:
-                district = "Unknown"
+            # Extract location (if available, and not already located with its batch)
+            if district is None:
+                district = self._extract_district(tweet.text) or "Unknown"
             
-            # Calculate severity based on engagement
-            metrics = tweet.public_metrics
-            engagement = metrics.get('like_count', 0) + metrics.get('retweet_count', 0) * 2
+            # Calculate severity based on engagement (unless scored with its batch)
+            if severity is None:
+                severity = float(self._classify_severities([tweet])[0])
             
-            if engagement > 1000:
-                severity = 4.5
-            elif engagement > 500:
-                severity = 4.0
-            elif engagement > 100:
-                severity = 3.5
-            else:
-                severity = 3.0
+            metrics = tweet.public_metrics or {}
+            likes = metrics.get('like_count', 0)
+            retweets = metrics.get('retweet_count', 0)
             
             signal = {
                 'district': district,
@@ -135,10 +190,10 @@ class TwitterIngestion:
                 'metadata': {
                     'tweet_id': str(tweet.id),
                     'author_id': str(tweet.author_id),
-                    'likes': metrics.get('like_count', 0),
-                    'retweets': metrics.get('retweet_count', 0),
+                    'likes': likes,
+                    'retweets': retweets,
                     'replies': metrics.get('reply_count', 0),
-                    'engagement_score': engagement
+                    'engagement_score': likes + retweets * 2
                 }
             }
             
@@ -148,12 +203,44 @@ class TwitterIngestion:
             print(f"Tweet conversion failed: {e}")
             return None
     
+    def _build_district_matcher(self):
+        """Aho-Corasick automaton over lowercased district names (None if unavailable)"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for priority, district in enumerate(self.districts):
+            automaton.add_word(district.lower(), (priority, district))
+        automaton.make_automaton()
+        return automaton
+    
     def _extract_district(self, text: str) -> Optional[str]:
         """Extract district name from tweet text"""
-        text_lower = text.lower()
+        return self._match_district(text.lower())
+    
+    def _extract_districts(self, texts: List[str]) -> List[Optional[str]]:
+        """Extract district names for a batch of tweet texts"""
+        lowered = pd.Series(texts, dtype=object).str.lower()
+        
+        if self._district_matcher is not None:
+            return [self._match_district(text_lower) for text_lower in lowered]
         
-        for district in self.districts:
-            if district.lower() in text_lower:
+        # One substring pass per district over the whole batch, earliest district first
+        districts = pd.Series(None, index=lowered.index, dtype=object)
+        for district_lower, district in self._districts_lower:
+            matched = districts.isna() & lowered.str.contains(district_lower, regex=False)
+            districts[matched] = district
+        return districts.where(districts.notna(), None).tolist()
+    
+    def _match_district(self, text_lower: str) -> Optional[str]:
+        """Earliest listed district named in already-lowercased text"""
+        if self._district_matcher is not None:
+            # Single pass over the text; earliest district in the list wins, as in the scan below
+            matches = [match for _, match in self._district_matcher.iter(text_lower)]
+            return min(matches)[1] if matches else None
+        
+        for district_lower, district in self._districts_lower:
+            if district_lower in text_lower:
                 return district
         
         return None
@@ -168,11 +255,57 @@ class TwitterIngestion:
 class NewsAPIIngestion:
     """News API data ingestion service"""
     
+    # Severity tiers by keyword, highest first
+    SEVERITY_KEYWORDS = {
+        5.0: ['killed', 'dead', 'death', 'bombing', 'explosion'],
+        4.5: ['violence', 'clash', 'attack', 'shooting'],
+        4.0: ['protest', 'tension', 'conflict', 'riot'],
+        3.5: ['alert', 'warning', 'concern'],
+        3.0: ['situation', 'incident', 'event']
+    }
+    DEFAULT_SEVERITY = 2.5
+    
     def __init__(self, api_key: Optional[str] = None):
         """Initialize News API client"""
         self.api_key = api_key or os.getenv('NEWS_API_KEY')
         self.base_url = "https://newsapi.org/v2"
         self.enabled = self.api_key is not None
+        self._severity_matcher = self._build_severity_matcher()
+    
+    def _build_severity_matcher(self):
+        """Aho-Corasick automaton mapping keyword -> severity (None if unavailable)"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for severity, keywords in self.SEVERITY_KEYWORDS.items():
+            for keyword in keywords:
+                automaton.add_word(keyword, severity)
+        automaton.make_automaton()
+        return automaton
+    
+    def _classify_severities(self, texts: List[str]) -> List[float]:
+        """Severity of the highest keyword tier found in each (lowercased) text"""
+        if self._severity_matcher is not None:
+            # Single pass over each text
+            return [
+                max(
+                    (severity for _, severity in self._severity_matcher.iter(text)),
+                    default=self.DEFAULT_SEVERITY
+                )
+                for text in texts
+            ]
+        
+        # One alternation regex per tier over the whole batch, highest tier first
+        series = pd.Series(texts, dtype=object)
+        severities = pd.Series(self.DEFAULT_SEVERITY, index=series.index)
+        unassigned = pd.Series(True, index=series.index)
+        for severity, keywords in self.SEVERITY_KEYWORDS.items():
+            pattern = '|'.join(map(re.escape, keywords))
+            matched = unassigned & series.str.contains(pattern, regex=True)
+            severities[matched] = severity
+            unassigned &= ~matched
+        return severities.tolist()
     
     async def fetch_news(
         self,
@@ -202,11 +335,25 @@ class NewsAPIIngestion:
             async with aiohttp.ClientSession() as session:
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
-                        data = await response.json()
-                        articles = data.get('articles', [])
+                        if ijson is not None:
+                            # Parse articles incrementally as the body arrives
+                            articles = [
+                                article async for article in
+                                ijson.items_async(response.content, 'articles.item', use_float=True)
+                            ]
+                        else:
+                            data = await response.json()
+                            articles = data.get('articles', [])
                         
-                        # Convert to signals
-                        signals = [self._article_to_signal(article) for article in articles]
+                        # Classify the whole batch at once, then convert to signals
+                        severities = self._classify_severities([
+                            f"{article.get('title', '')} {article.get('description', '')}".lower()
+                            for article in articles
+                        ])
+                        signals = [
+                            self._article_to_signal(article, severity)
+                            for article, severity in zip(articles, severities)
+                        ]
                         return [s for s in signals if s]
                     else:
                         print(f"News API error: {response.status}")
@@ -216,25 +363,13 @@ class NewsAPIIngestion:
             print(f"News fetch failed: {e}")
             return []
     
-    def _article_to_signal(self, article: Dict) -> Optional[Dict]:
+    def _article_to_signal(self, article: Dict, severity: Optional[float] = None) -> Optional[Dict]:
         """Convert news article to signal"""
         try:
-            # Determine severity from title/description
-            text = f"{article.get('title', '')} {article.get('description', '')}".lower()
-            
-            severity_keywords = {
-                5.0: ['killed', 'dead', 'death', 'bombing', 'explosion'],
-                4.5: ['violence', 'clash', 'attack', 'shooting'],
-                4.0: ['protest', 'tension', 'conflict', 'riot'],
-                3.5: ['alert', 'warning', 'concern'],
-                3.0: ['situation', 'incident', 'event']
-            }
-            
-            severity = 2.5  # Default
-            for sev, keywords in severity_keywords.items():
-                if any(kw in text for kw in keywords):
-                    severity = sev
-                    break
+            # Determine severity from title/description (unless classified with its batch)
+            if severity is None:
+                text = f"{article.get('title', '')} {article.get('description', '')}".lower()
+                severity = self._classify_severities([text])[0]
             
             signal = {
                 'district': 'Manipur',  # General for news
@@ -277,50 +412,52 @@ class DataIngestionScheduler:
         # Twitter
         if self.twitter.enabled:
             tweets = await self.twitter.fetch_recent_tweets(hours_ago=4)
-            for signal in tweets:
-                if self._insert_signal(signal):
-                    results['twitter'] += 1
+            results['twitter'] = self._insert_signals(tweets)
         
         # News
         if self.news.enabled:
             articles = await self.news.fetch_news(days_ago=1)
-            for signal in articles:
-                if self._insert_signal(signal):
-                    results['news'] += 1
+            results['news'] = self._insert_signals(articles)
         
         results['total'] = results['twitter'] + results['news']
         
         print(f"Ingestion complete: {results}")
         return results
     
-    def _insert_signal(self, signal: Dict) -> bool:
-        """Insert signal into database"""
+    def _insert_signals(self, signals: List[Dict]) -> int:
+        """Insert signals in one statement, skipping ones already stored; returns count inserted"""
+        if not signals:
+            return 0
+        
         try:
-            # Check for duplicates
-            existing = self.db.query_one("""
-                SELECT id FROM signals WHERE source_id = %s
-            """, (signal['source_id'],))
+            # Duplicates are dropped by the unique index on source_id
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(signals))
+            params = []
+            for signal in signals:
+                params.extend((
+                    signal['district'],
+                    signal['timestamp'],
+                    signal['event_summary'],
+                    signal['source_type'],
+                    signal['source_id'],
+                    signal['severity_score'],
+                    signal.get('metadata', {})
+                ))
             
-            if existing:
-                return False  # Already exists
-            
-            # Insert
-            self.db.execute("""
+            inserted = self.db.query(f"""
                 INSERT INTO signals 
                     (district, timestamp, event_summary, source_type, source_id, severity_score, metadata)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                signal['district'],
-                signal['timestamp'],
-                signal['event_summary'],
-                signal['source_type'],
-                signal['source_id'],
-                signal['severity_score'],
-                signal.get('metadata', {})
-            ))
+                VALUES {placeholders}
+                ON CONFLICT (source_id) DO NOTHING
+                RETURNING id, district
+            """, tuple(params))
+            
+            # Cached briefings for these districts no longer reflect their signals
+            for district in {row['district'] for row in inserted}:
+                invalidate_briefing(district)
             
-            return True
+            return len(inserted)
             
         except Exception as e:
             print(f"Signal insertion failed: {e}")
-            return False
+            return 0
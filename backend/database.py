@@ -2,9 +2,10 @@
 Database setup and models for NE-NETRA
 Uses SQLite for prototype - easily upgradeable to PostgreSQL for production
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Boolean, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from datetime import datetime
 
 # SQLite database - stored in backend directory
@@ -17,6 +18,26 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async access to the same database for I/O-bound async endpoints
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./ne_netra.db"
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; NORMAL syncs once per WAL checkpoint, not per commit"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=1073741824")  # Memory-map up to 1 GB
+    cursor.close()
+
 Base = declarative_base()
 
 
@@ -26,6 +47,10 @@ class Message(Base):
     COMPLIANCE: District-level only, no individual tracking
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        # Per-district reads are ordered by time
+        Index("ix_messages_district_timestamp", "district", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     district = Column(String, index=True)
@@ -45,6 +70,9 @@ class RiskScore(Base):
     Stores computed risk scores for each district
     """
     __tablename__ = "risk_scores"
+    __table_args__ = (
+        Index("ix_risk_scores_district_timestamp", "district", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     district = Column(String, index=True)
@@ -88,6 +116,9 @@ class AuditLog(Base):
     Complete audit trail for accountability
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_district_timestamp", "district", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     district = Column(String, index=True)
@@ -114,6 +145,11 @@ class RiskRule(Base):
 # Create all tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    
+    # create_all skips tables that already exist, so add any newer indexes to them
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 # Dependency for getting DB session
@@ -123,3 +159,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency for getting an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -16,6 +16,14 @@ CREATE INDEX IF NOT EXISTS idx_signals_severity
 CREATE INDEX IF NOT EXISTS idx_signals_source_type 
     ON signals(source_type);
 
+-- Ingestion dedup (INSERT ... ON CONFLICT (source_id) DO NOTHING)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_source_id 
+    ON signals(source_id);
+
+-- Per-day signal aggregates (causal simulator, anomaly detector)
+CREATE INDEX IF NOT EXISTS idx_signals_district_day 
+    ON signals(district, (DATE(timestamp)));
+
 -- Risk scores table
 CREATE INDEX IF NOT EXISTS idx_risk_scores_composite 
     ON risk_scores(district, date DESC, score);
@@ -28,6 +36,10 @@ CREATE INDEX IF NOT EXISTS idx_risk_scores_high_risk
 CREATE INDEX IF NOT EXISTS idx_actions_district_status 
     ON actions(district, status, created_at DESC);
 
+-- Per-day action counts (causal simulator)
+CREATE INDEX IF NOT EXISTS idx_actions_district_day_type 
+    ON actions(district, (created_at::date), action_type);
+
 -- Audit trail (from RBAC)
 CREATE INDEX IF NOT EXISTS idx_audit_trail_timestamp 
     ON audit_trail(timestamp DESC);
@@ -6,11 +6,15 @@ COMPLIANCE:
 - DPDP Act 2023 alignment
 - Append-only hash-chained logs
 """
+import os
 import re
+import atexit
 import hashlib
 import json
+import queue
+import threading
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 class PIIRedaction:
     """
@@ -37,11 +41,20 @@ class PIIRedaction:
         if not text:
             return ""
         
-        sanitized = text
-        for pattern, replacement in PIIRedaction.PATTERNS:
-            sanitized = re.sub(pattern, replacement, sanitized)
-        
-        return sanitized
+        # Single scan: each match is replaced with its own pattern's token
+        return _PII_UNION.sub(lambda match: _PII_REPLACEMENTS[match.lastgroup], text)
+
+# All patterns fused into one alternation compiled once at import, one named group per pattern
+_PII_UNION = re.compile('|'.join(
+    f'(?P<pii{i}>{pattern})' for i, (pattern, _) in enumerate(PIIRedaction.PATTERNS)
+))
+_PII_REPLACEMENTS = {f'pii{i}': replacement for i, (_, replacement) in enumerate(PIIRedaction.PATTERNS)}
+
+# Events waiting for the background writer; log_event blocks once this many are pending
+AUDIT_QUEUE_SIZE = 10000
+# Most queued events chained into a single write
+AUDIT_BATCH_MAX = 512
+
 
 class ImmutableAuditLog:
     """
@@ -51,49 +64,293 @@ class ImmutableAuditLog:
     def __init__(self):
         self._log_file = "audit_chain.log"
         self._last_hash = self._get_last_hash()
+        self._lock = threading.Lock()
+        # One append handle for the process (opened on first write) instead of an open/close per event
+        self._fh = None
+        # log_event only enqueues; one writer thread chains and appends in batches
+        self._queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._drain, name="audit-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
     
     def _get_last_hash(self) -> str:
         """Get the hash of the last entry or genesis hash"""
         try:
-            with open(self._log_file, 'r') as f:
-                lines = f.readlines()
-                if not lines:
-                    return "GENESIS_HASH_0000"
-                last_line = json.loads(lines[-1])
-                return last_line.get('hash', "GENESIS_HASH_0000")
+            last_line = self._read_last_line()
         except FileNotFoundError:
             return "GENESIS_HASH_0000"
+        
+        if not last_line:
+            return "GENESIS_HASH_0000"
+        return json.loads(last_line).get('hash', "GENESIS_HASH_0000")
+    
+    def _read_last_line(self, block_size: int = 4096) -> bytes:
+        """Read only the final line of the log, scanning back from the end in blocks"""
+        with open(self._log_file, 'rb') as f:
+            end = f.seek(0, 2)
+            tail = b""
+            pos = end
+            while pos > 0:
+                pos = max(0, pos - block_size)
+                f.seek(pos)
+                tail = f.read(end - pos)
+                # A newline before the last entry's own line means it is complete
+                if tail.rstrip(b"\n").rfind(b"\n") != -1:
+                    break
+            lines = tail.splitlines()
+            return lines[-1] if lines else b""
 
     def log_event(self, action: str, actor: str, details: Dict[str, Any]):
         """
         Log a secured event
+        
+        The event is timestamped and serialized here, so unserializable details
+        raise to the caller and later changes to them are not logged. The writer
+        thread chains and appends it; call flush() to wait until it is in the file.
+        """
+        self._queue.put(self._prepare_entry(action, actor, details, datetime.utcnow().isoformat()))
+    
+    def pending(self) -> int:
+        """Events queued but not yet written (for backpressure monitoring)"""
+        return self._queue.qsize()
+    
+    def _drain(self):
+        """Writer thread: chain and append queued events, up to AUDIT_BATCH_MAX per write"""
+        while True:
+            events = [self._queue.get()]
+            while len(events) < AUDIT_BATCH_MAX:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._append(events)
+            except Exception as e:
+                # Payloads were serialized by log_event, so only I/O errors get here
+                print(f"Audit log write failed, {len(events)} events dropped: {e}")
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+    
+    def log_batch(self, events: List[Tuple[str, str, Dict[str, Any]]]) -> List[str]:
         """
+        Chain and append several (action, actor, details) events with a single write
+        
+        Runs synchronously and returns the new entries' hashes.
+        """
+        # One timestamp for the whole batch; entries stay distinct through prev_hash
         timestamp = datetime.utcnow().isoformat()
+        return self._append([
+            self._prepare_entry(action, actor, details, timestamp)
+            for action, actor, details in events
+        ])
+    
+    def _append(self, entries: List[Tuple[str, str]]) -> List[str]:
+        """Chain prepared entries onto the log with one write"""
+        with self._lock:
+            lines = []
+            hashes = []
+            prev_hash = self._last_hash
+            for entry in entries:
+                line, prev_hash = self._chain_entry(entry, prev_hash)
+                lines.append(line)
+                hashes.append(prev_hash)
+            
+            # Persist
+            if self._fh is None:
+                self._fh = open(self._log_file, 'ab', buffering=1 << 16)
+            self._fh.write("".join(lines).encode())
+            self._fh.flush()
+            
+            # The chain only advances once the whole batch is written
+            self._last_hash = prev_hash
+            self._on_append(lines)
+            return hashes
+    
+    def _on_append(self, lines: List[str]):
+        """Hook called (under the lock) with each batch of lines just written"""
+        pass
+    
+    @staticmethod
+    def _prepare_entry(action: str, actor: str, details: Dict[str, Any], timestamp: str) -> Tuple[str, str]:
+        """
+        Serialize everything in the payload except prev_hash (known only when chained)
         
-        # Payload to hash
-        payload = {
-            'timestamp': timestamp,
-            'action': action,
-            'actor': actor,
-            'details': details,
-            'prev_hash': self._last_hash
-        }
+        Returns the canonical JSON (sort_keys, default separators) of
+        {timestamp, action, actor, details, prev_hash} split around the
+        prev_hash value, so joining the halves reproduces json.dumps(payload).
+        """
+        head = (
+            f'{{"action": {json.dumps(action, sort_keys=True)}, '
+            f'"actor": {json.dumps(actor, sort_keys=True)}, '
+            f'"details": {json.dumps(details, sort_keys=True)}, '
+            f'"prev_hash": '
+        )
+        tail = f', "timestamp": {json.dumps(timestamp)}}}'
+        return head, tail
+    
+    def _chain_entry(self, entry: Tuple[str, str], prev_hash: str) -> Tuple[str, str]:
+        """Build the hash-chained log line that follows prev_hash, and its hash"""
+        head, tail = entry
         
         # Create hash
-        payload_str = json.dumps(payload, sort_keys=True)
+        payload_str = head + json.dumps(prev_hash) + tail
         current_hash = hashlib.sha256(payload_str.encode()).hexdigest()
         
-        entry = {
-            **payload,
-            'hash': current_hash
-        }
+        # The entry is the hashed payload plus its hash: extend the canonical
+        # string rather than serializing the payload a second time
+        line = f'{payload_str[:-1]}, "hash": "{current_hash}"}}\n'
+        return line, current_hash
+    
+    def flush(self, sync: bool = False):
+        """Write out queued and buffered entries; with sync=True also fsync them to disk (commit boundary)"""
+        self._queue.join()
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.flush()
+            if sync:
+                os.fsync(self._fh.fileno())
+    
+    def close(self):
+        """Write out queued entries and close the log handle"""
+        self._queue.join()
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+def _leaf_hash(entry: bytes) -> bytes:
+    """RFC 6962 leaf hash"""
+    return hashlib.sha256(b"\x00" + entry).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    """RFC 6962 interior node hash"""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+class MerkleAuditLog(ImmutableAuditLog):
+    """
+    Hash-chained audit log that is also an RFC 6962 Merkle tree over its lines
+    
+    Any entry can be proven to be in the log with O(log n) hashes instead of
+    replaying the chain. The tree is built from the log file on first use and
+    then kept up to date as entries are appended.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        # _levels[h][i] is the hash of the complete subtree over leaves [i * 2^h, (i + 1) * 2^h)
+        self._levels: Optional[List[List[bytes]]] = None
+    
+    def _on_append(self, lines: List[str]):
+        if self._levels is not None:
+            for line in lines:
+                self._add_leaf(_leaf_hash(line.rstrip("\n").encode()))
+    
+    def _add_leaf(self, leaf: bytes):
+        """Append a leaf, completing every subtree it closes (amortized O(1))"""
+        levels = self._levels
+        levels[0].append(leaf)
+        height, index = 0, len(levels[0]) - 1
+        while index % 2 == 1:
+            parent = _node_hash(levels[height][index - 1], levels[height][index])
+            height += 1
+            index //= 2
+            if height == len(levels):
+                levels.append([])
+            levels[height].append(parent)
+    
+    def _ensure_tree(self):
+        """Build the tree from the entries already in the log (caller holds the lock)"""
+        if self._levels is not None:
+            return
+        
+        self._levels = [[]]
+        if self._fh is not None:
+            self._fh.flush()
+        try:
+            with open(self._log_file, 'rb') as f:
+                for line in f:
+                    line = line.rstrip(b"\n")
+                    if line:
+                        self._add_leaf(_leaf_hash(line))
+        except FileNotFoundError:
+            pass
+    
+    def _subtree_hash(self, start: int, size: int) -> bytes:
+        """Merkle tree hash of leaves [start, start + size), from stored complete subtrees"""
+        if size & (size - 1) == 0:
+            height = size.bit_length() - 1
+            return self._levels[height][start >> height]
+        split = 1 << ((size - 1).bit_length() - 1)  # Largest power of two below size
+        return _node_hash(self._subtree_hash(start, split), self._subtree_hash(start + split, size - split))
+    
+    def _path(self, index: int, start: int, size: int) -> List[bytes]:
+        """RFC 6962 audit path for leaf index within leaves [start, start + size)"""
+        if size == 1:
+            return []
+        split = 1 << ((size - 1).bit_length() - 1)
+        if index < split:
+            return self._path(index, start, split) + [self._subtree_hash(start + split, size - split)]
+        return self._path(index - split, start + split, size - split) + [self._subtree_hash(start, split)]
+    
+    def size(self) -> int:
+        """Number of entries in the tree"""
+        self._queue.join()
+        with self._lock:
+            self._ensure_tree()
+            return len(self._levels[0])
+    
+    def root(self, size: Optional[int] = None) -> str:
+        """Root hash (hex) of the first `size` entries (default: all of them)"""
+        self._queue.join()
+        with self._lock:
+            self._ensure_tree()
+            size = len(self._levels[0]) if size is None else size
+            if size == 0:
+                return hashlib.sha256(b"").hexdigest()
+            return self._subtree_hash(0, size).hex()
+    
+    def inclusion_proof(self, index: int, size: Optional[int] = None) -> Dict[str, Any]:
+        """Leaf hash and audit path proving entry `index` is in the tree of `size` entries"""
+        self._queue.join()
+        with self._lock:
+            self._ensure_tree()
+            size = len(self._levels[0]) if size is None else size
+            if not 0 <= index < size <= len(self._levels[0]):
+                raise IndexError(f"No entry {index} in a tree of {size}")
+            return {
+                'index': index,
+                'tree_size': size,
+                'leaf_hash': self._levels[0][index].hex(),
+                'path': [node.hex() for node in self._path(index, 0, size)],
+                'root': self._subtree_hash(0, size).hex()
+            }
+    
+    @staticmethod
+    def verify_inclusion(leaf_hash: str, index: int, tree_size: int, path: List[str], root: str) -> bool:
+        """Check an inclusion proof against a root (RFC 9162 section 2.1.3.2)"""
+        if index >= tree_size:
+            return False
+        
+        fn, sn = index, tree_size - 1
+        r = bytes.fromhex(leaf_hash)
+        for node in map(bytes.fromhex, path):
+            if sn == 0:
+                return False
+            if fn & 1 or fn == sn:
+                r = _node_hash(node, r)
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+            else:
+                r = _node_hash(r, node)
+            fn >>= 1
+            sn >>= 1
         
-        # Persist
-        with open(self._log_file, 'a') as f:
-            f.write(json.dumps(entry) + "\n")
-            
-        self._last_hash = current_hash
-        return current_hash
+        return sn == 0 and r.hex() == root
 
 # Singleton instance
-audit_logger = ImmutableAuditLog()
+audit_logger = MerkleAuditLog()
@@ -6,31 +6,49 @@ Tracks DPDP compliance, data age, access patterns
 
 from typing import Dict, List
 from datetime import datetime, timedelta
+from cachetools import TTLCache
+
+# Dashboards poll the score every few seconds; the underlying counts move slowly
+CHECK_TTL_SECONDS = 60
 
 class GovernanceMetrics:
     """Calculate compliance and governance metrics"""
     
     def __init__(self, db_connection):
         self.db = db_connection
+        self._check_cache = TTLCache(maxsize=1, ttl=CHECK_TTL_SECONDS)
+    
+    def _counters(self) -> Dict:
+        """Counters behind every check, re-queried at most once per TTL"""
+        counters = self._check_cache.get('counters')
+        if counters is None:
+            counters = self._fetch_counters()
+            self._check_cache['counters'] = counters
+        return counters
+    
+    def invalidate(self):
+        """Drop cached counters (call after writes that affect compliance)"""
+        self._check_cache.clear()
     
     def get_compliance_score(self) -> Dict:
         """Calculate overall compliance score"""
         metrics = {}
+        counters = self._counters()
         
         # 1. Data retention compliance
-        metrics['data_retention'] = self._check_data_retention()
+        metrics['data_retention'] = self._check_data_retention(counters)
         
         # 2. Access control compliance
-        metrics['access_control'] = self._check_access_control()
+        metrics['access_control'] = self._check_access_control(counters)
         
         # 3. Audit trail completeness
-        metrics['audit_trail'] = self._check_audit_trail()
+        metrics['audit_trail'] = self._check_audit_trail(counters)
         
         # 4. PII protection
-        metrics['pii_protection'] = self._check_pii_protection()
+        metrics['pii_protection'] = self._check_pii_protection(counters)
         
         # 5. Encryption compliance
-        metrics['encryption'] = self._check_encryption()
+        metrics['encryption'] = self._check_encryption(counters)
         
         # Calculate overall score (weighted average)
         weights = {
@@ -53,17 +71,48 @@ class GovernanceMetrics:
             'last_updated': datetime.now().isoformat()
         }
     
-    def _check_data_retention(self) -> Dict:
+    def _fetch_counters(self) -> Dict:
+        """Every counter the checks need, in one round-trip"""
+        return self.db.query_one("""
+            SELECT
+                (SELECT COUNT(*)
+                 FROM signals
+                 WHERE timestamp < NOW() - INTERVAL '6 months'
+                 AND archived = false) AS unarchived_old,
+                (SELECT COUNT(*)
+                 FROM audit_trail
+                 WHERE action = 'access_denied'
+                 AND timestamp >= NOW() - INTERVAL '30 days') AS access_violations,
+                (SELECT COUNT(*)
+                 FROM user_permissions up
+                 JOIN users u ON u.id = up.user_id
+                 WHERE up.permission_level > u.required_level) AS over_permissioned,
+                (SELECT COUNT(*)
+                 FROM actions
+                 WHERE status = 'completed'
+                 AND created_at >= NOW() - INTERVAL '30 days') AS critical_actions,
+                (SELECT COUNT(*)
+                 FROM audit_trail
+                 WHERE action_type IN ('action_created', 'action_completed')
+                 AND timestamp >= NOW() - INTERVAL '30 days') AS logged_actions,
+                (SELECT MAX(timestamp)
+                 FROM pii_scan_log) AS last_scan,
+                (SELECT COUNT(*)
+                 FROM pii_detections
+                 WHERE field_visibility = 'public'
+                 AND resolved = false) AS exposed_pii,
+                -- Sensitive fields should be encrypted (bytea type)
+                (SELECT COUNT(*)
+                 FROM information_schema.columns
+                 WHERE table_schema = 'public'
+                 AND column_name IN ('password', 'api_key', 'token')
+                 AND data_type != 'bytea') AS unencrypted
+        """)
+    
+    def _check_data_retention(self, counters: Dict) -> Dict:
         """Check if data retention policies are enforced"""
         # Policy: Signals > 6 months should be archived
-        old_signals = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM signals
-            WHERE timestamp < NOW() - INTERVAL '6 months'
-            AND archived = false
-        """)
-        
-        total_old = old_signals['count']
+        total_old = counters['unarchived_old']
         
         if total_old == 0:
             score = 100
@@ -80,57 +129,34 @@ class GovernanceMetrics:
             }
         }
     
-    def _check_access_control(self) -> Dict:
+    def _check_access_control(self, counters: Dict) -> Dict:
         """Check access control violations"""
-        # Check for unauthorized access attempts
-        violations = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM audit_trail
-            WHERE action = 'access_denied'
-            AND timestamp >= NOW() - INTERVAL '30 days'
-        """)
+        # Unauthorized access attempts, and users with excessive permissions
+        violations = counters['access_violations']
+        over_permissioned = counters['over_permissioned']
         
-        # Check for users with excessive permissions
-        over_permissioned = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM user_permissions up
-            JOIN users u ON u.id = up.user_id
-            WHERE up.permission_level > u.required_level
-        """)
-        
-        total_issues = violations['count'] + (over_permissioned['count'] * 10)
+        total_issues = violations + (over_permissioned * 10)
         score = max(0, 100 - total_issues)
         
         return {
             'score': score,
             'status': 'compliant' if score >= 90 else 'review_required',
             'details': {
-                'access_violations_30d': violations['count'],
-                'over_permissioned_users': over_permissioned['count']
+                'access_violations_30d': violations,
+                'over_permissioned_users': over_permissioned
             }
         }
     
-    def _check_audit_trail(self) -> Dict:
+    def _check_audit_trail(self, counters: Dict) -> Dict:
         """Check audit trail completeness"""
         # All critical actions should be logged
-        critical_actions = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM actions
-            WHERE status = 'completed'
-            AND created_at >= NOW() - INTERVAL '30 days'
-        """)
-        
-        logged_actions = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM audit_trail
-            WHERE action_type IN ('action_created', 'action_completed')
-            AND timestamp >= NOW() - INTERVAL '30 days'
-        """)
+        critical_actions = counters['critical_actions']
+        logged_actions = counters['logged_actions']
         
-        if critical_actions['count'] == 0:
+        if critical_actions == 0:
             score = 100
         else:
-            coverage = (logged_actions['count'] / critical_actions['count']) * 100
+            coverage = (logged_actions / critical_actions) * 100
             score = min(100, coverage)
         
         return {
@@ -138,20 +164,16 @@ class GovernanceMetrics:
             'status': 'compliant' if score >= 98 else 'incomplete',
             'details': {
                 'coverage_percentage': round(score, 1),
-                'logged_actions': logged_actions['count'],
-                'total_actions': critical_actions['count']
+                'logged_actions': logged_actions,
+                'total_actions': critical_actions
             }
         }
     
-    def _check_pii_protection(self) -> Dict:
+    def _check_pii_protection(self, counters: Dict) -> Dict:
         """Check PII detection and protection"""
         # Check if PII scanning is running
-        last_scan = self.db.query_one("""
-            SELECT MAX(timestamp) as last_scan
-            FROM pii_scan_log
-        """)
-        
-        days_since_scan = (datetime.now() - last_scan['last_scan']).days if last_scan['last_scan'] else 999
+        last_scan = counters['last_scan']
+        days_since_scan = (datetime.now() - last_scan).days if last_scan else 999
         
         # Should scan weekly
         if days_since_scan <= 7:
@@ -162,14 +184,9 @@ class GovernanceMetrics:
             score = 50
         
         # Check for detected PII in public fields
-        exposed_pii = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM pii_detections
-            WHERE field_visibility = 'public'
-            AND resolved = false
-        """)
+        exposed_pii = counters['exposed_pii']
         
-        score -= exposed_pii['count'] * 5
+        score -= exposed_pii * 5
         score = max(0, score)
         
         return {
@@ -177,28 +194,21 @@ class GovernanceMetrics:
             'status': 'compliant' if score >= 90 else 'action_required',
             'details': {
                 'days_since_last_scan': days_since_scan,
-                'exposed_pii_count': exposed_pii['count']
+                'exposed_pii_count': exposed_pii
             }
         }
     
-    def _check_encryption(self) -> Dict:
+    def _check_encryption(self, counters: Dict) -> Dict:
         """Check encryption compliance"""
-        # Check if sensitive fields are encrypted
-        unencrypted = self.db.query_one("""
-            SELECT COUNT(*) as count
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-            AND column_name IN ('password', 'api_key', 'token')
-            AND data_type != 'bytea'  # Should be encrypted (bytea type)
-        """)
+        unencrypted = counters['unencrypted']
         
-        score = 100 if unencrypted['count'] == 0 else 60
+        score = 100 if unencrypted == 0 else 60
         
         return {
             'score': score,
             'status': 'compliant' if score == 100 else 'review_encryption',
             'details': {
-                'unencrypted_sensitive_fields': unencrypted['count']
+                'unencrypted_sensitive_fields': unencrypted
             }
         }
     
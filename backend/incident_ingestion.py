@@ -7,11 +7,16 @@ and structures them for district-level risk aggregation.
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import Dict, Iterable, Iterator, List, Optional, Literal, Set, Tuple
+from pydantic import BaseModel, Field, TypeAdapter
 from enum import Enum
 import re
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 
 class RiskLayer(str, Enum):
     """Risk classification layers"""
@@ -36,6 +41,16 @@ class GeoSensitivity(str, Enum):
     SENSITIVE_ZONE = "sensitive_zone"
 
 
+# Geo tag -> Message.geo_sensitivity value (market, highway, sensitive_zone, normal)
+MESSAGE_GEO_SENSITIVITY = {
+    GeoSensitivity.BORDER: "sensitive_zone",
+    GeoSensitivity.MARKET: "market",
+    GeoSensitivity.HIGHWAY: "highway",
+    GeoSensitivity.CAPITAL: "sensitive_zone",
+    GeoSensitivity.SENSITIVE_ZONE: "sensitive_zone"
+}
+
+
 class ProcessedSignal(BaseModel):
     """Structured risk signal ready for aggregation"""
     
@@ -76,10 +91,13 @@ class IncidentIngestionModule:
     """
     
     # Northeast states for validation
-    NE_STATES = {
+    NE_STATES = frozenset({
         "Assam", "Meghalaya", "Arunachal Pradesh", "Manipur",
         "Mizoram", "Nagaland", "Tripura", "Sikkim"
-    }
+    })
+    
+    # Lowercased name -> canonical name, for normalize_state
+    _NE_LOWER = {ne_state.lower(): ne_state for ne_state in NE_STATES}
     
     # Keywords for risk layer classification
     COGNITIVE_KEYWORDS = [
@@ -98,6 +116,32 @@ class IncidentIngestionModule:
         "smuggling", "border", "infiltration", "encounter"
     ]
     
+    # Polarity indicators
+    ESCALATORY_KEYWORDS = [
+        "violence", "clash", "attack", "threat", "protest", "bandh",
+        "shutdown", "blockade", "arms", "explosive", "warning", "tension"
+    ]
+    
+    STABILIZING_KEYWORDS = [
+        "resolved", "peace", "agreement", "dialogue", "withdrawn",
+        "called off", "suspended", "normalized", "restoration"
+    ]
+    
+    # Severity indicators
+    SCALE_KEYWORDS = ["mass", "large", "thousands", "hundreds"]
+    VIOLENCE_KEYWORDS = ["violence", "weapon", "arms", "firing", "explosive"]
+    DURATION_KEYWORDS = ["indefinite", "continuous", "ongoing", "prolonged"]
+    
+    # Set forms of the families above: checks against a match set cost O(hits), not O(family)
+    _COGNITIVE_SET = frozenset(COGNITIVE_KEYWORDS)
+    _NETWORK_SET = frozenset(NETWORK_KEYWORDS)
+    _PHYSICAL_SET = frozenset(PHYSICAL_KEYWORDS)
+    _ESCALATORY_SET = frozenset(ESCALATORY_KEYWORDS)
+    _STABILIZING_SET = frozenset(STABILIZING_KEYWORDS)
+    _SCALE_SET = frozenset(SCALE_KEYWORDS)
+    _VIOLENCE_SET = frozenset(VIOLENCE_KEYWORDS)
+    _DURATION_SET = frozenset(DURATION_KEYWORDS)
+    
     # Geo-sensitivity markers
     GEO_MARKERS = {
         "border": ["border", "international border", "indo-", "boundary", "frontier"],
@@ -107,33 +151,110 @@ class IncidentIngestionModule:
                    "kohima", "agartala", "gangtok", "secretariat"]
     }
     
+    GEO_TAGS = {
+        "border": GeoSensitivity.BORDER,
+        "market": GeoSensitivity.MARKET,
+        "highway": GeoSensitivity.HIGHWAY,
+        "capital": GeoSensitivity.CAPITAL
+    }
+    
     def __init__(self):
         """Initialize ingestion module"""
-        pass
+        self._keywords = self._all_keywords()
+        self._geo_keywords = {kw for markers in self.GEO_MARKERS.values() for kw in markers}
+        self._geo_sets = [
+            (self.GEO_TAGS[geo_type], frozenset(markers))
+            for geo_type, markers in self.GEO_MARKERS.items()
+        ]
+        self._keyword_matcher = self._build_keyword_matcher()
+    
+    def _all_keywords(self) -> Set[str]:
+        """Every classification keyword, across all families"""
+        keywords = set(
+            self.COGNITIVE_KEYWORDS + self.NETWORK_KEYWORDS + self.PHYSICAL_KEYWORDS
+            + self.ESCALATORY_KEYWORDS + self.STABILIZING_KEYWORDS
+            + self.SCALE_KEYWORDS + self.VIOLENCE_KEYWORDS + self.DURATION_KEYWORDS
+        )
+        for markers in self.GEO_MARKERS.values():
+            keywords.update(markers)
+        return keywords
+    
+    def _build_keyword_matcher(self):
+        """One Aho-Corasick automaton over every keyword (None if unavailable)"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for keyword in self._keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+    
+    def _matched_keywords(self, text_lower: str) -> Set[str]:
+        """Keywords contained in (already lowercased) text"""
+        if self._keyword_matcher is not None:
+            # Single pass over the text, overlapping matches included
+            return {keyword for _, keyword in self._keyword_matcher.iter(text_lower)}
+        
+        return {keyword for keyword in self._keywords if keyword in text_lower}
+    
+    def _extract_features(
+        self,
+        event_text: str,
+        location: Optional[str] = None
+    ) -> Tuple[List[RiskLayer], Polarity, int, List[GeoSensitivity]]:
+        """Layers, polarity, severity and geo tags from one lowercase and one keyword pass"""
+        event_lower = event_text.lower()
+        text_lower = event_lower + " " + (location or "").lower()
+        
+        if self._keyword_matcher is not None:
+            # Matches ending inside the event text classify the event; all of them tag geography
+            event_end = len(event_lower)
+            event_hits, text_hits = set(), set()
+            for end, keyword in self._keyword_matcher.iter(text_lower):
+                text_hits.add(keyword)
+                if end < event_end:
+                    event_hits.add(keyword)
+        else:
+            event_hits = self._matched_keywords(event_lower)
+            text_hits = event_hits | {kw for kw in self._geo_keywords if kw in text_lower}
+        
+        risk_layers = self.classify_risk_layers(event_text, event_hits)
+        polarity = self.determine_polarity(event_text, event_hits)
+        severity = self.calculate_severity(event_text, risk_layers, event_hits)
+        geo_tags = self.tag_geo_sensitivity(event_text, location, text_hits)
+        return risk_layers, polarity, severity, geo_tags
     
     def normalize_state(self, state: str) -> Optional[str]:
         """Normalize state name"""
-        state = state.strip().title()
-        for ne_state in self.NE_STATES:
-            if ne_state.lower() in state.lower() or state.lower() in ne_state.lower():
+        key = state.strip().lower()
+        
+        # Exact name (any casing) is a single lookup
+        ne_state = self._NE_LOWER.get(key)
+        if ne_state is not None:
+            return ne_state
+        
+        for ne_lower, ne_state in self._NE_LOWER.items():
+            if ne_lower in key or key in ne_lower:
                 return ne_state
         return None
     
-    def classify_risk_layers(self, event_text: str) -> List[RiskLayer]:
-        """Classify event into risk layers based on content"""
-        event_lower = event_text.lower()
+    def classify_risk_layers(self, event_text: str, hits: Optional[Set[str]] = None) -> List[RiskLayer]:
+        """Classify event into risk layers based on content (or its already matched keywords)"""
+        if hits is None:
+            hits = self._matched_keywords(event_text.lower())
         layers = []
         
         # Check cognitive layer
-        if any(kw in event_lower for kw in self.COGNITIVE_KEYWORDS):
+        if not hits.isdisjoint(self._COGNITIVE_SET):
             layers.append(RiskLayer.COGNITIVE)
         
         # Check network layer
-        if any(kw in event_lower for kw in self.NETWORK_KEYWORDS):
+        if not hits.isdisjoint(self._NETWORK_SET):
             layers.append(RiskLayer.NETWORK)
         
         # Check physical layer
-        if any(kw in event_lower for kw in self.PHYSICAL_KEYWORDS):
+        if not hits.isdisjoint(self._PHYSICAL_SET):
             layers.append(RiskLayer.PHYSICAL)
         
         # Default to cognitive if no match
@@ -142,24 +263,13 @@ class IncidentIngestionModule:
         
         return layers
     
-    def determine_polarity(self, event_text: str) -> Polarity:
+    def determine_polarity(self, event_text: str, hits: Optional[Set[str]] = None) -> Polarity:
         """Determine if event is escalatory or stabilizing"""
-        event_lower = event_text.lower()
-        
-        # Escalatory indicators
-        escalatory = [
-            "violence", "clash", "attack", "threat", "protest", "bandh",
-            "shutdown", "blockade", "arms", "explosive", "warning", "tension"
-        ]
-        
-        # Stabilizing indicators
-        stabilizing = [
-            "resolved", "peace", "agreement", "dialogue", "withdrawn",
-            "called off", "suspended", "normalized", "restoration"
-        ]
+        if hits is None:
+            hits = self._matched_keywords(event_text.lower())
         
-        escalatory_count = sum(1 for kw in escalatory if kw in event_lower)
-        stabilizing_count = sum(1 for kw in stabilizing if kw in event_lower)
+        escalatory_count = len(hits & self._ESCALATORY_SET)
+        stabilizing_count = len(hits & self._STABILIZING_SET)
         
         if stabilizing_count > escalatory_count:
             return Polarity.STABILIZING
@@ -168,21 +278,27 @@ class IncidentIngestionModule:
         else:
             return Polarity.NEUTRAL
     
-    def calculate_severity(self, event_text: str, risk_layers: List[RiskLayer]) -> int:
+    def calculate_severity(
+        self,
+        event_text: str,
+        risk_layers: List[RiskLayer],
+        hits: Optional[Set[str]] = None
+    ) -> int:
         """Calculate preliminary severity score (1-5)"""
-        event_lower = event_text.lower()
+        if hits is None:
+            hits = self._matched_keywords(event_text.lower())
         score = 1  # Base score
         
         # Scale of participation
-        if any(kw in event_lower for kw in ["mass", "large", "thousands", "hundreds"]):
+        if not hits.isdisjoint(self._SCALE_SET):
             score += 1
         
         # Violence or weapons
-        if any(kw in event_lower for kw in ["violence", "weapon", "arms", "firing", "explosive"]):
+        if not hits.isdisjoint(self._VIOLENCE_SET):
             score += 2
         
         # Duration/indefinite
-        if any(kw in event_lower for kw in ["indefinite", "continuous", "ongoing", "prolonged"]):
+        if not hits.isdisjoint(self._DURATION_SET):
             score += 1
         
         # Multiple risk layers
@@ -191,23 +307,17 @@ class IncidentIngestionModule:
         
         return min(5, score)  # Cap at 5
     
-    def tag_geo_sensitivity(self, event_text: str, location: Optional[str] = None) -> List[GeoSensitivity]:
+    def tag_geo_sensitivity(
+        self,
+        event_text: str,
+        location: Optional[str] = None,
+        hits: Optional[Set[str]] = None
+    ) -> List[GeoSensitivity]:
         """Tag geographic sensitivity"""
-        text = (event_text + " " + (location or "")).lower()
-        tags = []
-        
-        for geo_type, keywords in self.GEO_MARKERS.items():
-            if any(kw in text for kw in keywords):
-                if geo_type == "border":
-                    tags.append(GeoSensitivity.BORDER)
-                elif geo_type == "market":
-                    tags.append(GeoSensitivity.MARKET)
-                elif geo_type == "highway":
-                    tags.append(GeoSensitivity.HIGHWAY)
-                elif geo_type == "capital":
-                    tags.append(GeoSensitivity.CAPITAL)
-        
-        return tags
+        if hits is None:
+            hits = self._matched_keywords((event_text + " " + (location or "")).lower())
+        
+        return [tag for tag, markers in self._geo_sets if not hits.isdisjoint(markers)]
     
     def generate_rationale(
         self, 
@@ -235,7 +345,8 @@ class IncidentIngestionModule:
         event_summary: str,
         location: Optional[str] = None,
         timestamp: Optional[datetime] = None,
-        source_url: Optional[str] = None
+        source_url: Optional[str] = None,
+        ingested_at: Optional[datetime] = None
     ) -> ProcessedSignal:
         """
         Process a single incident into a structured risk signal
@@ -245,24 +356,18 @@ class IncidentIngestionModule:
         - No PII storage
         - Public source marking
         - Explainable classification
+        
+        ingested_at lets batch callers share one clock reading across signals.
         """
+        now = ingested_at or datetime.now()
         
         # Normalize state
         normalized_state = self.normalize_state(state)
         if not normalized_state:
             raise ValueError(f"Invalid state: {state}. Must be NE state.")
         
-        # Classify into risk layers
-        risk_layers = self.classify_risk_layers(event_summary)
-        
-        # Determine polarity
-        polarity = self.determine_polarity(event_summary)
-        
-        # Calculate severity
-        severity = self.calculate_severity(event_summary, risk_layers)
-        
-        # Tag geo-sensitivity
-        geo_tags = self.tag_geo_sensitivity(event_summary, location)
+        # Classify risk layers, polarity, severity and geo-sensitivity in one pass
+        risk_layers, polarity, severity, geo_tags = self._extract_features(event_summary, location)
         
         # Generate rationale
         rationale = self.generate_rationale(risk_layers, polarity, severity, geo_tags)
@@ -273,9 +378,10 @@ class IncidentIngestionModule:
             district=district.strip(),
             location=location.strip() if location else None,
             event_summary=event_summary.strip(),
-            timestamp=timestamp or datetime.now(),
+            timestamp=timestamp or now,
             source_url=source_url,
             source_type="public_open_source",
+            ingestion_timestamp=now,
             risk_layers=risk_layers,
             polarity=polarity,
             severity_score=severity,
@@ -299,8 +405,11 @@ class IncidentIngestionModule:
         - timestamp: Optional[datetime]
         - source_url: Optional[str]
         """
-        processed_signals = []
-        
+        return list(self.process_stream(incidents))
+    
+    def process_stream(self, incidents: Iterable[Dict]) -> Iterator[ProcessedSignal]:
+        """Lazily process incidents one at a time (same dict format as process_batch)"""
+        ingested_at = datetime.now()
         for incident in incidents:
             try:
                 signal = self.process_incident(
@@ -309,18 +418,53 @@ class IncidentIngestionModule:
                     event_summary=incident.get("event_summary"),
                     location=incident.get("location"),
                     timestamp=incident.get("timestamp"),
-                    source_url=incident.get("source_url")
+                    source_url=incident.get("source_url"),
+                    ingested_at=ingested_at
                 )
-                processed_signals.append(signal)
             except Exception as e:
                 print(f"Error processing incident: {e}")
                 continue
+            
+            yield signal
+    
+    def persist_batch(self, session, signals: List[ProcessedSignal]) -> int:
+        """
+        Store signals as messages with one multi-row INSERT and a single commit
         
-        return processed_signals
+        Text is PII-redacted and the first geo tag is mapped onto the Message
+        geo_sensitivity vocabulary (market, highway, sensitive_zone, normal).
+        Rows are left unprocessed for the analysis pass. Returns the number of rows written.
+        """
+        from database import Message
+        from governance import PIIRedaction
+        
+        rows = [
+            {
+                "district": signal.district,
+                "text": PIIRedaction.redact(signal.event_summary),
+                "source_type": signal.source_type,
+                "geo_sensitivity": (
+                    MESSAGE_GEO_SENSITIVITY[signal.geo_sensitivity[0]] if signal.geo_sensitivity else "normal"
+                ),
+                "timestamp": signal.timestamp,
+                "processed": False
+            }
+            for signal in signals
+        ]
+        if not rows:
+            return 0
+        
+        session.execute(Message.__table__.insert(), rows)
+        session.commit()
+        return len(rows)
     
     def export_for_storage(self, signals: List[ProcessedSignal]) -> List[Dict]:
         """Export signals in format ready for database storage"""
-        return [signal.model_dump(mode='json') for signal in signals]
+        # One serializer call for the whole list instead of a model_dump per signal
+        return _SIGNAL_LIST.dump_python(list(signals), mode='json')
+
+
+_SIGNAL_LIST = TypeAdapter(List[ProcessedSignal])
 
 
 # Example usage
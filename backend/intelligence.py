@@ -10,10 +10,20 @@ COMPLIANCE NOTES:
 - 3-Layer Risk Model (Cognitive, Network, Physical)
 """
 from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from typing import List, Dict, Optional, Set, Tuple
 import re
 import math
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Unicode blocks used for script detection
+DEVANAGARI_RE = re.compile(r'[\u0900-\u097F]')
+BENGALI_RE = re.compile(r'[\u0980-\u09FF]')
+
 
 class LowResourcePipeline:
     """
@@ -24,9 +34,12 @@ class LowResourcePipeline:
         """
         Simple heuristic for script detection
         """
-        if re.search(r'[\u0900-\u097F]', text):
+        # Pure-ASCII text (the common case) cannot contain either script
+        if text.isascii():
+            return 'roman'
+        if DEVANAGARI_RE.search(text):
             return 'devanagari'
-        if re.search(r'[\u0980-\u09FF]', text):
+        if BENGALI_RE.search(text):
             return 'bengali'
         return 'roman'
 
@@ -39,6 +52,10 @@ class LowResourcePipeline:
         return text.lower().strip()
 
 
+# Per-word script lookups repeat heavily across messages, so memoize them
+_word_script = lru_cache(maxsize=65536)(LowResourcePipeline.detect_script)
+
+
 # Import comprehensive NE district configuration (169 districts across 8 states)
 try:
     from ne_districts_config import (
@@ -101,6 +118,9 @@ class RiskIntelligence:
         r'\b(urgent|emergency|immediate)\b.*\b(action|response)\b',
     ]
     
+    # All escalation patterns as one precompiled alternation (only "any match" is used)
+    _ESCALATION_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in ESCALATION_PATTERNS))
+    
     # Sentiment indicators
     NEGATIVE_SENTIMENT = [
         'bad', 'wrong', 'terrible', 'awful', 'worse', 'worst',
@@ -112,18 +132,60 @@ class RiskIntelligence:
         'harmony', 'solve', 'solution', 'progress'
     ]
     
+    # Resharing indicators for the network layer
+    SHARE_KEYWORDS = ['share', 'spread', 'rt', 'forward']
+    
+    # Set forms of the lists above, to count matches with set intersections
+    _TOXICITY_HIGH_SET = frozenset(TOXICITY_KEYWORDS['high'])
+    _TOXICITY_MEDIUM_SET = frozenset(TOXICITY_KEYWORDS['medium'])
+    _TOXICITY_LOW_SET = frozenset(TOXICITY_KEYWORDS['low'])
+    _NEGATIVE_SET = frozenset(NEGATIVE_SENTIMENT)
+    _POSITIVE_SET = frozenset(POSITIVE_SENTIMENT)
+    _SHARE_SET = frozenset(SHARE_KEYWORDS)
+    
     def __init__(self):
         self.pipeline = LowResourcePipeline()
+        self._keywords = (
+            self._TOXICITY_HIGH_SET | self._TOXICITY_MEDIUM_SET | self._TOXICITY_LOW_SET
+            | self._NEGATIVE_SET | self._POSITIVE_SET | self._SHARE_SET
+        )
+        self._keyword_matcher = self._build_keyword_matcher()
+    
+    def _build_keyword_matcher(self):
+        """One Aho-Corasick automaton over every keyword (None if unavailable)"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for keyword in self._keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+    
+    def _matched_keywords(self, text_lower: str) -> Set[str]:
+        """Keywords contained in (already lowercased) text"""
+        if self._keyword_matcher is not None:
+            # Single pass over the text, overlapping matches included
+            return {keyword for _, keyword in self._keyword_matcher.iter(text_lower)}
+        
+        return {keyword for keyword in self._keywords if keyword in text_lower}
+    
+    def _normalize(self, text: str) -> Tuple[str, Set[str]]:
+        """Normalized text and its matched keywords, computed once per message"""
+        text_norm = self.pipeline.normalize_text(text)
+        return text_norm, self._matched_keywords(text_norm)
     
     def analyze_sentiment(self, text: str) -> float:
         """
         Sentiment: -1.0 to +1.0
         """
         # Pre-process
-        text_norm = self.pipeline.normalize_text(text)
-        
-        positive_count = sum(1 for word in self.POSITIVE_SENTIMENT if word in text_norm)
-        negative_count = sum(1 for word in self.NEGATIVE_SENTIMENT if word in text_norm)
+        _, hits = self._normalize(text)
+        return self._sentiment_score(hits)
+    
+    def _sentiment_score(self, hits: Set[str]) -> float:
+        positive_count = len(hits & self._POSITIVE_SET)
+        negative_count = len(hits & self._NEGATIVE_SET)
         
         total = positive_count + negative_count
         if total == 0:
@@ -136,25 +198,29 @@ class RiskIntelligence:
         """
         Toxicity: 0.0 to 1.0
         """
-        text_norm = self.pipeline.normalize_text(text)
-        
-        high = sum(1 for w in self.TOXICITY_KEYWORDS['high'] if w in text_norm)
-        medium = sum(1 for w in self.TOXICITY_KEYWORDS['medium'] if w in text_norm)
-        low = sum(1 for w in self.TOXICITY_KEYWORDS['low'] if w in text_norm)
+        return self._toxicity_score(*self._normalize(text))
+    
+    def _toxicity_score(self, text_norm: str, hits: Set[str]) -> float:
+        high = len(hits & self._TOXICITY_HIGH_SET)
+        medium = len(hits & self._TOXICITY_MEDIUM_SET)
+        low = len(hits & self._TOXICITY_LOW_SET)
         
         score = (high * 1.0 + medium * 0.5 + low * 0.2)
         
         # Escalation multiplier
-        escalation_multiplier = 1.0
-        for pattern in self.ESCALATION_PATTERNS:
-            if re.search(pattern, text_norm):
-                escalation_multiplier = 1.5
-                break
+        escalation_multiplier = 1.5 if self._ESCALATION_RE.search(text_norm) else 1.0
         
         score *= escalation_multiplier
         
         # Max cap at 1.0 (assuming ~10 indicators is max risk)
         return min(1.0, score / 10.0)
+    
+    def analyze_text(self, text: str) -> Tuple[float, float]:
+        """
+        (sentiment, toxicity) from a single normalization and keyword pass
+        """
+        text_norm, hits = self._normalize(text)
+        return self._sentiment_score(hits), self._toxicity_score(text_norm, hits)
 
     def calculate_velocity(self, messages: List[Dict], window_hours: int = 6) -> float:
         """
@@ -175,26 +241,31 @@ class RiskIntelligence:
     # 3-LAYER RISK MODEL
     # ---------------------------------------------------------
 
-    def calculate_cognitive_risk(self, messages: List[Dict]) -> Tuple[float, float, float]:
+    def calculate_cognitive_risk(
+        self,
+        messages: List[Dict],
+        normalized: Optional[List[Tuple[str, Set[str]]]] = None
+    ) -> Tuple[float, float, float]:
         """
         Layer 1: Cognitive Risk (C_t)
         Returns: (cognitive_score_0_10, avg_sentiment, avg_toxicity)
         """
         if not messages:
             return 0.0, 0.0, 0.0
+        if normalized is None:
+            normalized = [self._normalize(m.get('text', '')) for m in messages]
             
         total_tox = 0.0
         total_sent = 0.0
         code_switch_count = 0
         
-        for m in messages:
-            text = m.get('text', '')
-            total_tox += self.analyze_toxicity(text)
-            total_sent += self.analyze_sentiment(text)
+        for text_norm, hits in normalized:
+            total_tox += self._toxicity_score(text_norm, hits)
+            total_sent += self._sentiment_score(hits)
             
             # Simple heuristic: mixed scripts in one batch?
             # Or per message check (simplified here)
-            if self.pipeline.detect_script(text) != 'roman':
+            if self.pipeline.detect_script(text_norm) != 'roman':
                 code_switch_count += 1
                 
         avg_tox = total_tox / len(messages)
@@ -215,17 +286,24 @@ class RiskIntelligence:
         
         return c_t, avg_sent, avg_tox
 
-    def calculate_network_risk(self, messages: List[Dict]) -> Tuple[float, float]:
+    def calculate_network_risk(
+        self,
+        messages: List[Dict],
+        normalized: Optional[List[Tuple[str, Set[str]]]] = None
+    ) -> Tuple[float, float]:
         """
         Layer 2: Network Risk (N_t)
         Returns: (network_score_0_10, velocity_score)
         """
+        if normalized is None:
+            normalized = [self._normalize(m.get('text', '')) for m in messages]
+        
         # Velocity
         velocity_score = self.calculate_velocity(messages)
         
         # Cluster Density Proxy (Heuristic: messages / unique_sources)
         # Using simulated simple logic if source not available
-        sources = set(m.get('source_type', 'unknown') for m in messages)
+        # (source diversity is not scored yet, so unique sources are not collected)
         # If all messages from same source type, echo-chamber risk higher? 
         # Actually usually diversity -> spread. Here let's assume Velocity is main driver.
         # But User asked for: "Cluster density proxy" & "Echo-chamber strength"
@@ -238,11 +316,7 @@ class RiskIntelligence:
         # N_t = Velocity * 10
         # Multiplier if 'shared' keywords present
         
-        share_keywords = ['share', 'spread', 'rt', 'forward']
-        share_count = sum(
-            1 for m in messages 
-            if any(k in m.get('text', '').lower() for k in share_keywords)
-        )
+        share_count = sum(1 for _, hits in normalized if not hits.isdisjoint(self._SHARE_SET))
         viral_factor = share_count / len(messages) if messages else 0
         
         viral_multiplier = 1.0 + viral_factor # Up to 2.0x
@@ -330,7 +404,11 @@ class RiskIntelligence:
             'disclaimer': 'Heuristic early-warning window based on policy guidance, not a prediction or command'
         }
 
-    def _generate_cognitive_examples(self, messages: List[Dict]) -> List[Dict]:
+    def _generate_cognitive_examples(
+        self,
+        messages: List[Dict],
+        normalized: Optional[List[Tuple[str, Set[str]]]] = None
+    ) -> List[Dict]:
         """
         Generate synthetic examples from aggregated linguistic features.
         
@@ -343,30 +421,24 @@ class RiskIntelligence:
         """
         if not messages:
             return []
+        if normalized is None:
+            normalized = [self._normalize(m.get('text', '')) for m in messages]
         
         examples = []
         
         # Aggregate keyword patterns (not actual messages)
         toxicity_keywords_found = set()
         sentiment_keywords_found = set()
-        escalation_patterns_found = []
+        escalation_found = False
         languages_detected = set()
         
-        for m in messages:
-            text = m.get('text', '').lower()
-            
+        for text, hits in normalized:
             # Aggregate patterns, not content
-            for keyword in self.TOXICITY_KEYWORDS['high']:
-                if keyword in text:
-                    toxicity_keywords_found.add(keyword)
-            
-            for keyword in self.NEGATIVE_SENTIMENT:
-                if keyword in text:
-                    sentiment_keywords_found.add(keyword)
+            toxicity_keywords_found |= hits & self._TOXICITY_HIGH_SET
+            sentiment_keywords_found |= hits & self._NEGATIVE_SET
             
-            for pattern in self.ESCALATION_PATTERNS:
-                if re.search(pattern, text):
-                    escalation_patterns_found.append('escalation_pattern')
+            if not escalation_found and self._ESCALATION_RE.search(text):
+                escalation_found = True
             
             # Detect script
             lang = self.pipeline.detect_script(text)
@@ -390,7 +462,7 @@ class RiskIntelligence:
                 'aggregation_note': 'Synthetic example based on aggregated patterns. No actual message content.'
             })
         
-        if escalation_patterns_found:
+        if escalation_found:
             examples.append({
                 'text_sample': f'Synthetic example: Temporal urgency patterns (today/tomorrow references)',
                 'language': list(languages_detected)[0] if languages_detected else 'roman',
@@ -424,15 +496,15 @@ class RiskIntelligence:
             script_counts[script] += 1
             
             # Heuristic dialect detection
-            if 'assamese' in text or re.search(r'[\u0980-\u09FF]', text):
+            if 'assamese' in text or BENGALI_RE.search(text):
                 dialect_set.add('assamese')
             if 'bengali' in text or 'বাংলা' in text:
                 dialect_set.add('bengali')
             if 'bodo' in text:
                 dialect_set.add('bodo')
             
-            # Code-switching detection (mixed scripts in single message)
-            if len(set([self.pipeline.detect_script(word) for word in text.split()])) > 1:
+            # Code-switching detection (mixed scripts in single message); all-ASCII text is one script
+            if not text.isascii() and len({_word_script(word) for word in text.split()}) > 1:
                 code_switch_count += 1
         
         total = len(messages)
@@ -567,9 +639,12 @@ class RiskIntelligence:
         if not messages:
             return self._empty_response()
             
+        # Normalize and keyword-match each message once for every layer that reads text
+        normalized = [self._normalize(m.get('text', '')) for m in messages]
+        
         # 1. Calculate Layer Scores (0-10 scale)
-        c_t, avg_sent, avg_tox = self.calculate_cognitive_risk(messages)
-        n_t, velocity = self.calculate_network_risk(messages)
+        c_t, avg_sent, avg_tox = self.calculate_cognitive_risk(messages, normalized)
+        n_t, velocity = self.calculate_network_risk(messages, normalized)
         p_t, avg_geo = self.calculate_physical_risk(messages)
         
         # 2. Weighted Sum
@@ -626,7 +701,7 @@ class RiskIntelligence:
         time_to_escalation = self.calculate_time_to_escalation(velocity, trend, c_t, n_t)
         
         # Generate cognitive examples (synthetic only)
-        cognitive_examples = self._generate_cognitive_examples(messages)
+        cognitive_examples = self._generate_cognitive_examples(messages, normalized)
         
         # Get risk threshold information
         threshold_info = self.get_risk_threshold_info(composite_score)
@@ -694,9 +769,17 @@ class RiskIntelligence:
             'hotspots': []
         }
 
+    _LAYER_LABELS = (
+        'Cognitive Risk (Language/Toxicity)',
+        'Network Risk (Velocity/Spread)',
+        'Physical Risk (Geo/Volatility)'
+    )
+
     def _get_primary_layer(self, c, n, p) -> str:
-        vals = {'Cognitive Risk (Language/Toxicity)': c, 'Network Risk (Velocity/Spread)': n, 'Physical Risk (Geo/Volatility)': p}
-        return max(vals.items(), key=lambda x: x[1])[0]
+        # Ties go to the earlier layer, as max() over (c, n, p) did
+        if c >= n and c >= p:
+            return self._LAYER_LABELS[0]
+        return self._LAYER_LABELS[1] if n >= p else self._LAYER_LABELS[2]
 
     def _determine_trend(self, current_score: float, messages: List[Dict]) -> str:
         # Simplified previous Trend logic
@@ -50,7 +50,7 @@ DISTRICT_COORDINATES = {
 
 from database import get_db, init_db, Message, RiskScore, OfficerReview, AuditLog, RiskRule
 from models import (
-    MessageIngest, RiskScoreResponse, OfficerReviewInput,
+    MessageIngest, MessageBatchIngest, RiskScoreResponse, OfficerReviewInput,
     AuditLogEntry, AnalysisRequest, AnalysisResponse
 )
 from intelligence import RiskIntelligence
@@ -80,7 +80,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
         # 2. Process request
         response = await call_next(request)
         
-        # 3. Log (Non-blocking usually, here sync for pilot)
+        # 3. Log (queued; the audit writer thread appends it off the request path)
         # Only log state-changing ops or significant reads
         if request.method in ["POST", "PUT", "DELETE"] or "risk-score" in request.url.path:
             audit_logger.log_event(
@@ -157,8 +157,7 @@ def ingest_data(message: MessageIngest, db: Session = Depends(get_db)):
     )
     
     # Analyze message immediately
-    sentiment = ai_engine.analyze_sentiment(sanitized_text)
-    toxicity = ai_engine.analyze_toxicity(sanitized_text)
+    sentiment, toxicity = ai_engine.analyze_text(sanitized_text)
     
     db_message.sentiment_score = sentiment
     db_message.toxicity_score = toxicity
@@ -203,6 +202,79 @@ def ingest_data(message: MessageIngest, db: Session = Depends(get_db)):
     }
 
 
+@app.post("/ingest_batch")
+def ingest_batch(batch: MessageBatchIngest, db: Session = Depends(get_db)):
+    """
+    Ingest many public/synthetic messages in one request
+    
+    Same processing as /ingest per message, but all rows are written
+    in a single transaction with one immutable audit entry per batch.
+    """
+    now = datetime.utcnow()
+    db_messages = []
+    pii_flags = []
+    
+    for message in batch.signals:
+        # PII Redaction + immediate analysis
+        sanitized_text = PIIRedaction.redact(message.text)
+        sentiment, toxicity = ai_engine.analyze_text(sanitized_text)
+        
+        db_messages.append(Message(
+            district=message.district,
+            text=sanitized_text,
+            source_type=message.source_type,
+            geo_sensitivity=message.geo_sensitivity,
+            timestamp=message.timestamp or now,
+            sentiment_score=sentiment,
+            toxicity_score=toxicity,
+            processed=True
+        ))
+        pii_flags.append(sanitized_text != message.text)
+    
+    db.add_all(db_messages)
+    db.flush()  # Assign message ids
+    
+    # DB Log (for UI)
+    db.add_all([
+        AuditLog(
+            district=db_message.district,
+            officer_name="System",
+            action=f"Data ingested: {db_message.source_type}",
+            meta_info=json.dumps({"message_id": db_message.id})
+        )
+        for db_message in db_messages
+    ])
+    db.commit()
+    
+    # Immutable Log (Legal)
+    audit_logger.log_event(
+        action="Data ingested: batch",
+        actor="System",
+        details={
+            "count": len(db_messages),
+            "message_ids": [db_message.id for db_message in db_messages],
+            "districts": sorted({db_message.district for db_message in db_messages})
+        }
+    )
+    
+    return {
+        "status": "success",
+        "ingested": len(db_messages),
+        "results": [
+            {
+                "status": "success",
+                "message_id": db_message.id,
+                "district": db_message.district,
+                "analyzed": True,
+                "sentiment": round(db_message.sentiment_score, 3),
+                "toxicity": round(db_message.toxicity_score, 3),
+                "pii_redacted": pii_redacted
+            }
+            for db_message, pii_redacted in zip(db_messages, pii_flags)
+        ]
+    }
+
+
 @app.post("/analyze", response_model=AnalysisResponse)
 def analyze_district(request: AnalysisRequest, db: Session = Depends(get_db)):
     """
@@ -12,6 +12,7 @@ import asyncio
 
 # Phase 3: AI/ML
 from .ai_routes import router as ai_router
+from .action_recommender import ActionRecommender
 
 # Phase 4: Auth & Security
 from .auth_middleware import get_auth_router, get_protected_router
@@ -34,6 +35,7 @@ rbac_service = None
 webhook_service = None
 automation_scheduler = None
 sms_alert_service = None
+action_recommender = None
 
 
 @asynccontextmanager
@@ -41,6 +43,7 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     global cache_service, jwt_service, auth_service, rbac_service
     global webhook_service, automation_scheduler, sms_alert_service
+    global action_recommender
     
     # Startup
     print("=== NE-NETRA API Startup ===")
@@ -49,6 +52,12 @@ async def lifespan(app: FastAPI):
     # db = connect_to_database()
     db = None  # Replace with actual connection
     
+    # Phase 3: AI/ML
+    if db:
+        # Train once up front (off the event loop) instead of on first request
+        action_recommender = ActionRecommender(db)
+        await asyncio.to_thread(action_recommender.train_model)
+    
     # Phase 4: Security & Performance
     print("Initializing Phase 4 services...")
     cache_service = CacheService(
@@ -58,7 +67,8 @@ async def lifespan(app: FastAPI):
     jwt_service = JWTService(
         secret_key=os.getenv('JWT_SECRET_KEY', 'change-this-in-production'),
         access_token_expire_minutes=30,
-        refresh_token_expire_days=7
+        refresh_token_expire_days=7,
+        cache=cache_service
     )
     
     if db:
@@ -108,6 +118,7 @@ async def lifespan(app: FastAPI):
     print("\n=== Shutting down ===")
     if cache_service and cache_service.enabled:
         cache_service.redis.close()
+        cache_service.pool.disconnect()
     if automation_scheduler:
         automation_scheduler.stop()
     print("✅ Shutdown complete")
@@ -239,6 +250,9 @@ def get_webhook_service() -> WebhookService:
 def get_sms_service() -> SMSAlertService:
     return sms_alert_service
 
+def get_action_recommender() -> ActionRecommender:
+    return action_recommender
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -42,7 +42,8 @@ async def lifespan(app: FastAPI):
     jwt_service = JWTService(
         secret_key=os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production'),
         access_token_expire_minutes=30,
-        refresh_token_expire_days=7
+        refresh_token_expire_days=7,
+        cache=cache_service
     )
     
     # Database connection (placeholder - use your actual DB)
@@ -62,6 +63,7 @@ async def lifespan(app: FastAPI):
     print("Shutting down services...")
     if cache_service and cache_service.enabled:
         cache_service.redis.close()
+        cache_service.pool.disconnect()
     print("Services stopped")
 
 
@@ -6,7 +6,7 @@ Uses ML to predict future risk scores based on historical patterns.
 
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 from typing import List, Dict, Tuple
 import pickle
 import os
@@ -114,11 +114,18 @@ class RiskPredictor:
     def predict_7_days(
         self,
         district: str,
-        recent_data: pd.DataFrame
+        recent_data: Dict[str, np.ndarray]
     ) -> Dict:
         """
         Predict next 7 days of risk scores
         
+        Args:
+            recent_data: Column arrays of equal length, oldest first:
+                - date (datetime64[D])
+                - risk_score
+                - signal_count
+                - avg_severity
+        
         Returns:
             {
                 'predictions': List[{'date': str, 'score': float, 'confidence_low': float, 'confidence_high': float}],
@@ -131,7 +138,7 @@ class RiskPredictor:
             return self._fallback_prediction(recent_data)
         
         predictions = []
-        last_date = pd.to_datetime(recent_data.iloc[-1]['date'])
+        last_date = recent_data['date'][-1].astype(date)
         
         for day in range(1, 8):
             future_date = last_date + timedelta(days=day)
@@ -173,29 +180,29 @@ class RiskPredictor:
     
     def _build_future_features(
         self,
-        date: datetime,
-        recent_data: pd.DataFrame,
+        future_date: date,
+        recent_data: Dict[str, np.ndarray],
         predictions: List[Dict]
     ) -> List[float]:
         """Build feature vector for future date"""
-        day_of_week = date.dayofweek
-        month = date.month
-        day_of_year = date.timetuple().tm_yday
+        day_of_week = future_date.weekday()
+        month = future_date.month
+        day_of_year = future_date.timetuple().tm_yday
         seasonal = np.sin(2 * np.pi * day_of_year / 365)
         
         # Trend from recent actual + predicted data
         if len(predictions) >= 3:
             recent_scores = [p['score'] for p in predictions[-3:]]
         else:
-            recent_scores = list(recent_data.tail(3)['risk_score'].values)
+            recent_scores = list(recent_data['risk_score'][-3:])
             recent_scores.extend([p['score'] for p in predictions])
             recent_scores = recent_scores[-3:]
         
         trend = np.polyfit(range(len(recent_scores)), recent_scores, 1)[0] if recent_scores else 0
         
         # Signal count and severity (use recent average)
-        signal_count = recent_data.tail(7)['signal_count'].mean()
-        avg_severity = recent_data.tail(7)['avg_severity'].mean()
+        signal_count = recent_data['signal_count'][-7:].mean()
+        avg_severity = recent_data['avg_severity'][-7:].mean()
         
         return [day_of_week, month, seasonal, trend, signal_count, avg_severity]
     
@@ -210,10 +217,10 @@ class RiskPredictor:
         else:
             return 'stable'
     
-    def _fallback_prediction(self, recent_data: pd.DataFrame) -> Dict:
+    def _fallback_prediction(self, recent_data: Dict[str, np.ndarray]) -> Dict:
         """Simple fallback when ML unavailable"""
-        last_score = recent_data.iloc[-1]['risk_score']
-        recent_avg = recent_data.tail(7)['risk_score'].mean()
+        last_score = recent_data['risk_score'][-1]
+        recent_avg = recent_data['risk_score'][-7:].mean()
         
         predictions = []
         for day in range(1, 8):
@@ -18,6 +18,11 @@ class MessageIngest(BaseModel):
     timestamp: Optional[datetime] = None
 
 
+class MessageBatchIngest(BaseModel):
+    """Input model for ingesting many messages in one request"""
+    signals: List[MessageIngest] = Field(..., max_length=1000, description="Messages to ingest")
+
+
 class RiskScoreResponse(BaseModel):
     """Response model for risk score"""
     district: str
@@ -59,8 +59,7 @@ def seed_db():
             sanitized_text = PIIRedaction.redact(msg['text'])
             
             # Analyze
-            sentiment = ai_engine.analyze_sentiment(sanitized_text)
-            toxicity = ai_engine.analyze_toxicity(sanitized_text)
+            sentiment, toxicity = ai_engine.analyze_text(sanitized_text)
             
             db_msg = Message(
                 district=district,
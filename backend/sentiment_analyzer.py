@@ -45,24 +45,47 @@ class SentimentAnalyzer:
         if self.analyzer:
             try:
                 result = self.analyzer(text[:512])[0]  # Truncate to model limit
-                emotion = self._detect_emotion(text)
-                polarity = result['score'] if result['label'] == 'POSITIVE' else -result['score']
-                
-                return {
-                    'label': result['label'],
-                    'score': float(result['score']),
-                    'emotion': emotion,
-                    'polarity': float(polarity)
-                }
+                return self._build_result(text, result)
             except Exception as e:
                 print(f"Sentiment analysis failed: {e}")
                 return self._fallback_sentiment(text)
         else:
             return self._fallback_sentiment(text)
     
-    def analyze_batch(self, texts: List[str]) -> List[Dict]:
-        """Analyze multiple texts"""
-        return [self.analyze_text(text) for text in texts]
+    def analyze_batch(self, texts: List[str], batch_size: int = 32) -> List[Dict]:
+        """
+        Analyze multiple texts
+        
+        All texts go through the transformer pipeline in a single call so
+        they are tokenized and run through the model in padded mini-batches
+        rather than one forward pass per text.
+        """
+        if not texts:
+            return []
+        
+        if self.analyzer:
+            try:
+                results = self.analyzer(
+                    [text[:512] for text in texts],  # Truncate to model limit
+                    batch_size=batch_size
+                )
+                return [self._build_result(text, result) for text, result in zip(texts, results)]
+            except Exception as e:
+                print(f"Batch sentiment analysis failed: {e}")
+        
+        return [self._fallback_sentiment(text) for text in texts]
+    
+    def _build_result(self, text: str, result: Dict) -> Dict:
+        """Convert a pipeline prediction into the sentiment response shape"""
+        emotion = self._detect_emotion(text)
+        polarity = result['score'] if result['label'] == 'POSITIVE' else -result['score']
+        
+        return {
+            'label': result['label'],
+            'score': float(result['score']),
+            'emotion': emotion,
+            'polarity': float(polarity)
+        }
     
     def _detect_emotion(self, text: str) -> str:
         """Simple keyword-based emotion detection"""